@@ -1,8 +1,18 @@
 from discord import app_commands, Interaction
 from discord.ext import commands
 import discord
-import os
+import io
+import json
+import math
 import logging
+import time
+
+from cluster import WORKER_STALE_SECONDS
+from command_sync import EXTENSIONS, sync_if_changed, sync_scope
+from guild_config import guild_configs
+from metrics import metrics
+from profiling import MODE_CPROFILE, MODE_SAMPLE, PROFILE_MAX_SECONDS, ProfilerBusy, profile_for
+from supervisor import supervisor
 
 logger = logging.getLogger('cogs')
 
@@ -13,40 +23,34 @@ class AdminCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @app_commands.command(name='resync', description='Clear and resync application commands (owner only)')
-    @app_commands.guilds(discord.Object(id=int(os.getenv('GUILD'))))
-    async def resync(self, interaction: Interaction):
+    @app_commands.command(name='resync', description='Resync application commands if they changed (owner only)')
+    @app_commands.describe(force='Sync even if the command payloads are unchanged')
+    @app_commands.default_permissions(administrator=True)
+    async def resync(self, interaction: Interaction, force: bool = False):
         if interaction.user.id != AUTH_ID:
             await interaction.response.send_message('You are not authorized to run this command.', ephemeral=True)
             return
 
         # Respond immediately to avoid timeout
         await interaction.response.send_message('🔄 Starting command resync...', ephemeral=True)
-        
+        metrics.observe_ack(interaction, 'resync')
+
         try:
-            guild_id = os.getenv('GUILD')
-            if guild_id:
-                guild_obj = discord.Object(id=int(guild_id))
-                logger.info('Clearing guild commands...')
-                # clear_commands is synchronous; do not await it
-                self.bot.tree.clear_commands(guild=guild_obj)
-                
-                logger.info('Syncing guild commands...')
-                synced = await self.bot.tree.sync(guild=guild_obj)
-                
-                await interaction.edit_original_response(content=f'✅ Cleared and synced {len(synced)} commands for guild {guild_id}')
-                logger.info('Resynced %d guild commands for %s by %s', len(synced), guild_id, interaction.user)
+            guild_obj, scope = sync_scope(self.bot.tree)
+
+            # tree.sync replaces the whole remote set, so stale commands go away without clearing first
+            logger.info('Syncing %s commands (force=%s)...', scope, force)
+            path, count = await sync_if_changed(self.bot.tree, guild=guild_obj, force=force)
+
+            if path == 'synced':
+                await interaction.edit_original_response(content=f'✅ Synced {count} commands ({scope})')
             else:
-                logger.info('Clearing global commands...')
-                # clear_commands is synchronous; do not await it
-                self.bot.tree.clear_commands()
-                
-                logger.info('Syncing global commands...')
-                synced = await self.bot.tree.sync()
-                
-                await interaction.edit_original_response(content=f'✅ Cleared and synced {len(synced)} global commands')
-                logger.info('Resynced %d global commands by %s', len(synced), interaction.user)
-                
+                await interaction.edit_original_response(
+                    content=f'✅ {count} commands ({scope}) already up to date ({path}); use force to sync anyway'
+                )
+            logger.info('Resync %s for %s: %s (%d commands) by %s', 'forced' if force else 'requested', scope,
+                        path, count, interaction.user)
+
         except Exception as e:
             logger.error('Resync failed: %s', e)
             try:
@@ -54,6 +58,292 @@ class AdminCog(commands.Cog):
             except Exception as edit_error:
                 logger.error('Failed to edit resync response: %s', edit_error)
 
+    @app_commands.command(name='reload', description='Reload a cog in place, keeping its live state (owner only)')
+    @app_commands.describe(extension='The cog to reload')
+    @app_commands.choices(extension=[app_commands.Choice(name=name, value=name) for name in EXTENSIONS])
+    @app_commands.default_permissions(administrator=True)
+    async def reload(self, interaction: Interaction, extension: app_commands.Choice[str]):
+        if interaction.user.id != AUTH_ID:
+            await interaction.response.send_message('You are not authorized to run this command.', ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        metrics.observe_ack(interaction, 'reload')
+
+        try:
+            elapsed, handed_off = await self.reload_extension(extension.value)
+        except Exception as e:
+            logger.error('Reload of %s failed: %s', extension.value, e)
+            await interaction.followup.send(f'❌ Reload of {extension.value} failed, previous version kept: '
+                                            f'{str(e)[:100]}', ephemeral=True)
+            return
+        logger.info('Reloaded %s in %.1fms (state handed off: %s) by %s', extension.value, elapsed * 1000,
+                    handed_off, interaction.user)
+
+        # The reloaded cog may have changed its commands; only syncs if the payloads differ
+        try:
+            guild_obj, scope = sync_scope(self.bot.tree)
+            path, count = await sync_if_changed(self.bot.tree, guild=guild_obj)
+            synced = f'synced {count} commands ({scope})' if path == 'synced' else 'commands unchanged'
+        except Exception as e:
+            logger.error('Command sync after reload failed: %s', e)
+            synced = f'command sync failed: {str(e)[:100]}'
+        await interaction.followup.send(
+            f'♻️ Reloaded {extension.value} in {elapsed * 1000:.1f}ms'
+            f'{" with live state handed off" if handed_off else ""}; {synced}.',
+            ephemeral=True
+        )
+
+    async def reload_extension(self, name: str) -> tuple:
+        """Reload `name`, passing the old cog's live state to the new one; returns (seconds, handed_off).
+
+        If loading the new code fails, discord.py restores the old module and its fresh instance
+        adopts the state instead, so nothing is lost either way.
+        """
+        if name not in self.bot.extensions:
+            raise commands.ExtensionNotLoaded(name)
+        old = next((cog for cog in self.bot.cogs.values() if cog.__module__ == name), None)
+        key = old.qualified_name if old is not None else None
+        handed_off = old is not None and hasattr(old, 'export_state')
+        started = time.perf_counter()
+        if handed_off:
+            self.bot.cog_handoff[key] = old.export_state()
+        try:
+            await self.bot.reload_extension(name)
+        finally:
+            leftover = self.bot.cog_handoff.pop(key, None)
+            if leftover is not None:
+                # Nobody adopted it (e.g. the new cog no longer takes state); shut it down properly
+                logger.warning('Reloaded %s did not adopt the previous state; releasing it', name)
+                await leftover['release']()
+                handed_off = False
+        return time.perf_counter() - started, handed_off
+
+    @app_commands.command(name='stats', description='Show bot latency and throughput metrics (owner only)')
+    @app_commands.default_permissions(administrator=True)
+    async def stats(self, interaction: Interaction):
+        if interaction.user.id != AUTH_ID:
+            await interaction.response.send_message('You are not authorized to run this command.', ephemeral=True)
+            return
+
+        await interaction.response.send_message(f'```\n{self.format_stats()[:1900]}\n```', ephemeral=True)
+        metrics.observe_ack(interaction, 'stats')
+
+    @app_commands.command(name='profile', description='Profile the live bot for a few seconds (owner only)')
+    @app_commands.describe(
+        seconds=f'How long to profile (1-{int(PROFILE_MAX_SECONDS)}s)',
+        mode='sample: low-overhead stack sampling; cprofile: exact call counts, slower while running',
+        top='How many functions / allocation sites to list',
+        memory='Also diff tracemalloc snapshots taken before and after'
+    )
+    @app_commands.choices(mode=[
+        app_commands.Choice(name='sample', value=MODE_SAMPLE),
+        app_commands.Choice(name='cprofile', value=MODE_CPROFILE),
+    ])
+    @app_commands.default_permissions(administrator=True)
+    async def profile(self, interaction: Interaction,
+                      seconds: app_commands.Range[float, 1.0, PROFILE_MAX_SECONDS] = 10.0,
+                      mode: app_commands.Choice[str] = None, top: app_commands.Range[int, 5, 200] = 40,
+                      memory: bool = False):
+        if interaction.user.id != AUTH_ID:
+            await interaction.response.send_message('You are not authorized to run this command.', ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        metrics.observe_ack(interaction, 'profile')
+        mode_value = mode.value if mode else MODE_SAMPLE
+
+        try:
+            logger.info('Profiling (%s, memory=%s) for %.0fs, requested by %s', mode_value, memory, seconds,
+                        interaction.user)
+            report = await profile_for(seconds, mode=mode_value, top=top, memory=memory)
+        except ProfilerBusy as e:
+            await interaction.followup.send(f'⏳ {e}; try again when it finishes.', ephemeral=True)
+            return
+        except Exception as e:
+            logger.error('Profiling failed: %s', e)
+            await interaction.followup.send(f'❌ Profiling failed: {str(e)[:100]}', ephemeral=True)
+            return
+
+        filename = f'profile-{mode_value}-{discord.utils.utcnow():%Y%m%d-%H%M%S}.txt'
+        await interaction.followup.send(
+            f'📈 {mode_value} profile for {seconds:.0f}s' + (' with tracemalloc diff' if memory else ''),
+            file=discord.File(io.BytesIO(report.encode('utf-8')), filename=filename),
+            ephemeral=True
+        )
+
+    config = app_commands.Group(
+        name='config',
+        description='Per-server bot settings',
+        guild_only=True,
+        default_permissions=discord.Permissions(manage_guild=True)
+    )
+
+    @config.command(name='show', description='Show this server\'s bot settings')
+    async def config_show(self, interaction: Interaction):
+        await interaction.response.send_message(self.format_config(guild_configs.get(interaction.guild_id)),
+                                                ephemeral=True)
+
+    @config.command(name='set', description='Change this server\'s bot settings (only the options you pass)')
+    @app_commands.describe(
+        category='Category new /request voice channels are created in',
+        lfg_channel='Channel /request must be used in',
+        timer_channel='Channel /set must be used in',
+        display_channel='Channel countdowns are posted in'
+    )
+    async def config_set(
+        self,
+        interaction: Interaction,
+        category: discord.CategoryChannel = None,
+        lfg_channel: discord.TextChannel = None,
+        timer_channel: discord.TextChannel = None,
+        display_channel: discord.TextChannel = None
+    ):
+        fields = {
+            name: channel.id
+            for name, channel in (
+                ('category_id', category),
+                ('lfg_channel_id', lfg_channel),
+                ('timer_channel_id', timer_channel),
+                ('display_channel_id', display_channel),
+            )
+            if channel is not None
+        }
+        if not fields:
+            await interaction.response.send_message('Nothing to change; pass at least one option.', ephemeral=True)
+            return
+
+        try:
+            config = guild_configs.update(interaction.guild_id, **fields)
+        except Exception as e:
+            logger.error('Config update for guild %s failed: %s', interaction.guild_id, e)
+            await interaction.response.send_message(f'❌ Could not save settings: {str(e)[:100]}', ephemeral=True)
+            return
+        await interaction.response.send_message('✅ Saved.\n' + self.format_config(config), ephemeral=True)
+        logger.info('Config for guild %s changed by %s: %s', interaction.guild_id, interaction.user, fields)
+
+    @config.command(name='clear', description='Unset one of this server\'s bot settings')
+    @app_commands.describe(setting='Setting to unset')
+    @app_commands.choices(setting=[
+        app_commands.Choice(name='Voice category', value='category_id'),
+        app_commands.Choice(name='LFG channel', value='lfg_channel_id'),
+        app_commands.Choice(name='Timer channel', value='timer_channel_id'),
+        app_commands.Choice(name='Countdown display channel', value='display_channel_id'),
+    ])
+    async def config_clear(self, interaction: Interaction, setting: app_commands.Choice[str]):
+        try:
+            config = guild_configs.update(interaction.guild_id, **{setting.value: None})
+        except Exception as e:
+            logger.error('Config update for guild %s failed: %s', interaction.guild_id, e)
+            await interaction.response.send_message(f'❌ Could not save settings: {str(e)[:100]}', ephemeral=True)
+            return
+        await interaction.response.send_message('✅ Cleared.\n' + self.format_config(config), ephemeral=True)
+        logger.info('Config for guild %s changed by %s: cleared %s',
+                    interaction.guild_id, interaction.user, setting.value)
+
+    @staticmethod
+    def format_config(config) -> str:
+        def mention(channel_id):
+            return f'<#{channel_id}>' if channel_id else '*not set*'
+
+        return '\n'.join([
+            f'**Voice category:** {mention(config.category_id)}',
+            f'**LFG channel:** {mention(config.lfg_channel_id)}',
+            f'**Timer channel:** {mention(config.timer_channel_id)}',
+            f'**Countdown display channel:** {mention(config.display_channel_id)}',
+        ])
+
+    def format_stats(self) -> str:
+        """Plain-text summary of shard health and the metrics registry for /stats."""
+        lines = self.format_shards() + self.format_cluster()
+
+        def quantiles(histogram):
+            return ' '.join(f'p{int(q * 100)}={histogram.quantile(q) * 1000:.0f}ms' for q in (0.5, 0.95, 0.99))
+
+        acks = metrics.histograms.get('command_ack_seconds', {})
+        if acks:
+            lines.append('Command ack latency:')
+            for key, histogram in sorted(acks.items()):
+                lines.append(f'  /{dict(key)["command"]:<10} n={histogram.count:<6} {quantiles(histogram)}')
+
+        routes = metrics.histograms.get('discord_http_request_seconds', {})
+        if routes:
+            rate_limited = metrics.counters.get('discord_http_429_total', {})
+            lines.append('Discord HTTP (top 10 routes by calls):')
+            top = sorted(routes.items(), key=lambda item: item[1].count, reverse=True)[:10]
+            for key, histogram in top:
+                route = dict(key)['route']
+                hits = rate_limited.get(key, 0)
+                lines.append(f'  {route[:48]:<48} n={histogram.count:<6} {quantiles(histogram)} 429s={hits}')
+
+        handlers = metrics.histograms.get('event_handler_seconds', {})
+        if handlers:
+            lines.append('Event handlers:')
+            for key, histogram in sorted(handlers.items()):
+                lines.append(f'  {dict(key)["event"]:<20} n={histogram.count:<6} {quantiles(histogram)}')
+
+        lag = metrics.histograms.get('event_loop_lag_seconds', {}).get(())
+        if lag:
+            slow = metrics.counters.get('slow_callbacks_total', {}).get((), 0)
+            lines.append(f'Event loop lag: n={lag.count:<6} {quantiles(lag)} slow_callbacks={slow}')
+
+        live = supervisor.counts()
+        if live or supervisor.failures:
+            lines.append(f'Background tasks: {sum(live.values())} live, {sum(supervisor.failures.values())} failed, '
+                         f'{sum(supervisor.escalations.values())} loops given up')
+
+        gauges = metrics.read_gauges()
+        if gauges:
+            lines.append('Gauges:')
+            for name, series in sorted(gauges.items()):
+                for key, value in series.items():
+                    label = ','.join(f'{k}={v}' for k, v in key)
+                    shown = f'{value:.3f}' if isinstance(value, float) else value
+                    lines.append(f'  {name}{"{" + label + "}" if label else ""} = {shown}')
+
+        return '\n'.join(lines) or 'No metrics recorded yet.'
+
+    def format_shards(self) -> list:
+        shards = getattr(self.bot, 'shards', None)
+        if not shards:
+            return []
+        health = getattr(self.bot, 'shard_health', {})
+        guild_counts = {}
+        for guild in self.bot.guilds:
+            guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+        lines = [f'Shards ({len(shards)}):']
+        for shard_id, shard in sorted(shards.items()):
+            state = health.get(shard_id, {})
+            status = 'down' if shard.is_closed() else ('ready' if state.get('ready') else 'connecting')
+            latency = 'n/a' if math.isnan(shard.latency) else f'{shard.latency * 1000:.0f}ms'
+            since = state.get('since')
+            since = f' since {since:%H:%M:%S}' if since else ''
+            lines.append(
+                f'  #{shard_id:<3} {status:<10} latency={latency:<7} guilds={guild_counts.get(shard_id, 0):<5} '
+                f'disconnects={state.get("disconnects", 0)}{since}'
+            )
+        return lines
+
+    def format_cluster(self) -> list:
+        """Every worker's last heartbeat, so any worker can report on the whole cluster."""
+        cluster = getattr(self.bot, 'cluster', None)
+        if cluster is None:
+            return []
+        now = time.time()
+        lines = [f'Cluster (this is worker {cluster.worker_id}, running shards {sorted(cluster.responsible)}):']
+        for worker_id, pid, shard_ids, shard_count, heartbeat_ts, stats in cluster.peers:
+            line = f'  w{worker_id:<3} pid={pid:<7} shards={shard_ids}/{shard_count} '
+            if not heartbeat_ts:
+                lines.append(line + 'stopped')
+                continue
+            age = now - heartbeat_ts
+            stats = json.loads(stats or '{}')
+            lines.append(
+                line + f'{"live" if age < WORKER_STALE_SECONDS else "stale"} beat={age:.0f}s ago '
+                f'guilds={stats.get("guilds", 0)} timers={stats.get("timers_live", 0)}'
+            )
+        return lines
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(AdminCog(bot))
@@ -0,0 +1,142 @@
+import logging
+import time
+from collections import deque
+
+from metrics import metrics
+from ratelimit import TokenBucket
+from supervisor import supervisor
+
+logger = logging.getLogger('cogs')
+
+# Minimum seconds between position/ETA updates sent to one waiting user
+QUEUE_UPDATE_SECONDS = 10.0
+
+
+class QueueFull(Exception):
+    pass
+
+
+class _Ticket:
+    __slots__ = ('user_id', 'job', 'enqueued', 'last_position', 'last_update')
+
+    def __init__(self, user_id: int, job):
+        self.user_id = user_id
+        self.job = job
+        self.enqueued = time.monotonic()
+        self.last_position = None
+        self.last_update = 0.0
+
+
+class _GuildLane:
+    __slots__ = ('order', 'bucket', 'task')
+
+    def __init__(self, bucket: TokenBucket):
+        self.order = deque()
+        self.bucket = bucket
+        self.task = None
+
+
+class AdmissionQueue:
+    """Per-guild FIFO in front of a rate-limited operation.
+
+    Jobs start in arrival order as fast as the guild's token bucket allows, so a burst is spread
+    across the rate-limit window instead of turning into 429s. `claim(guild_id, job)` lets the head
+    of the line start without a token by reserving something else synchronously (e.g. taking a warm
+    pooled channel off the pool for that job); it returns True if it did.
+    Waiting users hear their position and ETA through the `on_wait(job, position, eta)` callback,
+    at most every QUEUE_UPDATE_SECONDS. Background work that spends the same limit (e.g. refilling
+    the pool) takes tokens from `bucket(guild_id)` and should yield while `waiting(guild_id)`.
+    """
+
+    def __init__(self, rate: int, per: float, run, on_wait, claim=None, max_waiting: int = 50, owner: str = None):
+        self.rate = rate
+        self.per = per
+        self.run = run
+        self.on_wait = on_wait
+        self.claim = claim
+        self.max_waiting = max_waiting
+        self.owner = owner
+        self._buckets = {}
+        self._lanes = {}
+        self._users = {}
+        self.started = 0
+
+    @property
+    def depth(self) -> int:
+        return sum(len(lane.order) for lane in self._lanes.values())
+
+    def bucket(self, guild_id: int) -> TokenBucket:
+        bucket = self._buckets.get(guild_id)
+        if bucket is None:
+            bucket = self._buckets[guild_id] = TokenBucket(self.rate, self.per)
+        return bucket
+
+    def waiting(self, guild_id: int) -> int:
+        lane = self._lanes.get(guild_id)
+        return len(lane.order) if lane is not None else 0
+
+    def pending_for(self, user_id: int) -> int:
+        """Jobs `user_id` has waiting or running."""
+        return self._users.get(user_id, 0)
+
+    def eta(self, guild_id: int, position: int) -> float:
+        """Rough seconds until the job at `position` (0 = head of the line) starts."""
+        bucket = self.bucket(guild_id)
+        wait = bucket.delay()
+        if position == 0:
+            return wait
+        return wait + position / bucket.fill_rate
+
+    def submit(self, guild_id: int, user_id: int, job) -> int:
+        """Queue `job` and return its position; raises QueueFull if the guild's line is at capacity."""
+        lane = self._lanes.get(guild_id)
+        if lane is None:
+            lane = self._lanes[guild_id] = _GuildLane(self.bucket(guild_id))
+        if len(lane.order) >= self.max_waiting:
+            raise QueueFull(f'{len(lane.order)} requests already waiting')
+        lane.order.append(_Ticket(user_id, job))
+        self._users[user_id] = self._users.get(user_id, 0) + 1
+        if lane.task is None or lane.task.done():
+            lane.task = supervisor.spawn(self._drain(guild_id, lane), owner=self.owner)
+        return len(lane.order) - 1
+
+    def _done(self, user_id: int):
+        count = self._users.get(user_id, 0) - 1
+        if count > 0:
+            self._users[user_id] = count
+        else:
+            self._users.pop(user_id, None)
+
+    async def _start(self, ticket: _Ticket):
+        try:
+            await self.run(ticket.job)
+        finally:
+            self._done(ticket.user_id)
+
+    async def _drain(self, guild_id: int, lane: _GuildLane):
+        while lane.order:
+            # Claimed before any await, so each pooled channel admits at most one job without a token
+            if self.claim is None or not self.claim(guild_id, lane.order[0].job):
+                self._announce(guild_id, lane)
+                await lane.bucket.acquire()
+            ticket = lane.order.popleft()
+            metrics.observe('admission_wait_seconds', time.monotonic() - ticket.enqueued)
+            self.started += 1
+            supervisor.spawn(self._start(ticket), owner=self.owner)
+        lane.task = None
+        if not lane.order and self._lanes.get(guild_id) is lane:
+            del self._lanes[guild_id]
+
+    def _announce(self, guild_id: int, lane: _GuildLane):
+        """Tell waiting users whose position changed where they stand, without flooding edits."""
+        now = time.monotonic()
+        for position, ticket in enumerate(lane.order):
+            if ticket.last_position == position or now - ticket.last_update < QUEUE_UPDATE_SECONDS:
+                continue
+            eta = self.eta(guild_id, position)
+            # The head of the line starting right away needs no status message
+            if ticket.last_position is None and eta < 1.0:
+                continue
+            ticket.last_position = position
+            ticket.last_update = now
+            self.on_wait(ticket.job, position, eta)
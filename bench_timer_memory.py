@@ -0,0 +1,69 @@
+"""Measure per-timer memory for the countdown bookkeeping at 1k, 10k and 100k timers.
+
+Run with `python bench_timer_memory.py`. Counts everything the cog keeps per timer: the
+TimerRecord, its countdowns dict slot and its scheduler heap entry. The "embed" column is
+the previous layout for comparison, where every timer also pinned a prebuilt discord.Embed.
+"""
+import gc
+import time
+import tracemalloc
+
+import discord
+
+from records import TimerRecord
+from scheduler import TimerScheduler
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def _noop(key, due):
+    return None
+
+
+def build(count: int, with_embed: bool) -> tuple:
+    scheduler = TimerScheduler()
+    countdowns = {}
+    now_ts = int(time.time())
+    for i in range(count):
+        record = TimerRecord(
+            1_100_000_000_000_000_000 + i,
+            1_000_000_000_000_000_000,
+            900_000_000_000_000_000,
+            800_000_000_000_000_000 + i % 500,
+            now_ts + 86_400 + i,
+            f"Raid night #{i % 50}",
+            'adaptive',
+            footer_text=f"Created by member{i % 500}",
+            icon_url=None
+        )
+        if with_embed:
+            embed = discord.Embed(title="⏰ Countdown", description=record.description, color=discord.Color.blue())
+            embed.add_field(name="Ends At (UTC)", value="2030-01-01 00:00:00 UTC")
+            embed.add_field(name="Time Remaining", value="1d 0h")
+            embed.set_footer(text=record.footer_text)
+            record.embed = embed
+        countdowns[record.message_id] = record
+        scheduler.schedule(record.message_id, float(i), _noop)
+    return scheduler, countdowns
+
+
+def measure(count: int, with_embed: bool) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    state = build(count, with_embed)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del state
+    return (after - before) / count
+
+
+def main():
+    print(f"{'timers':>8}  {'record B/timer':>15}  {'+embed B/timer':>15}")
+    for count in SIZES:
+        print(f"{count:>8}  {measure(count, False):>15.0f}  {measure(count, True):>15.0f}")
+
+
+if __name__ == '__main__':
+    main()
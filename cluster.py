@@ -0,0 +1,277 @@
+"""Run the bot as several worker processes, each owning a contiguous range of shards.
+
+    python cluster.py --workers 4              # shard count from Discord's recommendation
+    python cluster.py --workers 2 --shards 8
+
+Workers are ordinary `main.py` processes started with CLUSTER_WORKER, SHARD_IDS and SHARD_COUNT.
+They share BOT_DB (SQLite in WAL mode) and heartbeat into it; when a worker stops heartbeating,
+the lowest-numbered live worker runs its shards' countdowns (timer edits are plain REST calls)
+until it is back. Crashed workers are restarted with backoff.
+
+Set DISCORD_API_BASE and DISCORD_GATEWAY to point the shard-count lookup and every worker at
+fake_discord.py.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import signal
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Run as the launcher, nothing has loaded .env yet; the imports below read their settings at import time
+load_dotenv()
+
+from log_config import LOG_FILE  # noqa: E402
+from metrics import metrics  # noqa: E402
+from store import WorkerStore  # noqa: E402
+from supervisor import supervisor  # noqa: E402
+
+logger = logging.getLogger('cogs')
+
+# Set by the launcher for each worker; unset means a standalone bot that owns every shard
+CLUSTER_WORKER = int(os.getenv('CLUSTER_WORKER')) if os.getenv('CLUSTER_WORKER') else None
+# Shards this process connects, e.g. "0-3" or "0,2"; unset lets discord.py run all of them
+SHARD_IDS = os.getenv('SHARD_IDS')
+DISCORD_API_BASE = os.getenv('DISCORD_API_BASE')
+DISCORD_GATEWAY = os.getenv('DISCORD_GATEWAY')
+WORKER_HEARTBEAT_SECONDS = float(os.getenv('WORKER_HEARTBEAT_SECONDS', '5'))
+# A worker whose heartbeat is older than this is considered gone and its shards are adopted
+WORKER_STALE_SECONDS = float(os.getenv('WORKER_STALE_SECONDS', '30'))
+# Launcher restart backoff, doubling per crash up to the max; reset once a worker stays up a minute
+RESTART_DELAY = float(os.getenv('CLUSTER_RESTART_DELAY', '1'))
+RESTART_DELAY_MAX = 60.0
+STABLE_SECONDS = 60.0
+
+# Heartbeat stats shown by /stats on every worker
+SHARED_GAUGES = ('timers_live', 'voice_channels_tracked', 'event_loop_lag_p99_seconds')
+
+
+def parse_shard_ids(text: str) -> list:
+    """Parse "0-3,6" into [0, 1, 2, 3, 6]."""
+    shard_ids = []
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        if '-' in part:
+            start, end = part.split('-', 1)
+            shard_ids.extend(range(int(start), int(end) + 1))
+        else:
+            shard_ids.append(int(part))
+    return sorted(set(shard_ids))
+
+
+def format_shard_ids(shard_ids) -> str:
+    return ','.join(str(shard_id) for shard_id in sorted(shard_ids))
+
+
+def shard_ranges(shard_count: int, workers: int) -> list:
+    """Split shards into `workers` contiguous, near-equal ranges."""
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for worker in range(workers):
+        size = base + (1 if worker < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    return (guild_id >> 22) % shard_count
+
+
+class ClusterNode:
+    """This worker's view of the cluster: heartbeats, peers and which shards' timers it runs.
+
+    A worker is responsible for its own shards, and the lowest-numbered live worker is also
+    responsible for every shard no live worker covers. When that set changes the bot dispatches
+    `cluster_ownership_changed` so cogs can pick up or release work.
+    """
+
+    def __init__(self, worker_id: int, shard_ids, shard_count: int, path: str = None):
+        self.worker_id = worker_id
+        self.shard_ids = set(shard_ids)
+        self.shard_count = shard_count
+        self.responsible = set(self.shard_ids)
+        self.peers = []
+        self.started_ts = time.time()
+        self.store = WorkerStore(path, check_same_thread=False)
+        self.bot = None
+        self._task = None
+
+    def owns_guild(self, guild_id) -> bool:
+        # Rows without a guild (legacy DM timers) follow shard 0
+        return shard_for_guild(guild_id or 0, self.shard_count) in self.responsible
+
+    def _stats(self) -> str:
+        stats = {'guilds': len(self.bot.guilds) if self.bot else 0}
+        if self.bot is not None and not math.isnan(self.bot.latency):
+            stats['latency'] = round(self.bot.latency, 4)
+        gauges = metrics.read_gauges()
+        for name in SHARED_GAUGES:
+            if name in gauges:
+                stats[name] = gauges[name].get(())
+        return json.dumps(stats)
+
+    def beat(self, stats: str = None) -> bool:
+        """Write our heartbeat, refresh peers and recompute responsibility; True if it changed.
+
+        Only touches SQLite and this node's own fields when `stats` is given, so it can run off the event loop.
+        """
+        now = time.time()
+        self.store.heartbeat(
+            self.worker_id, os.getpid(), format_shard_ids(self.shard_ids), self.shard_count, now,
+            self._stats() if stats is None else stats
+        )
+        self.peers = self.store.load_all()
+        live = [row for row in self.peers if now - row[4] < WORKER_STALE_SECONDS and row[3] == self.shard_count]
+        covered = set()
+        for row in live:
+            covered.update(parse_shard_ids(row[2]))
+        responsible = set(self.shard_ids)
+        # Peers starting alongside us haven't heartbeat yet; wait a stale period before adopting
+        settled = now - self.started_ts >= WORKER_STALE_SECONDS
+        if settled and live and min(row[0] for row in live) == self.worker_id:
+            orphaned = set(range(self.shard_count)) - covered
+            responsible |= orphaned
+        changed = responsible != self.responsible
+        if changed:
+            adopted = sorted(responsible - self.shard_ids)
+            logger.info("[Cluster] Worker %s now runs shards %s (adopted %s)",
+                        self.worker_id, format_shard_ids(responsible), adopted or 'none')
+        self.responsible = responsible
+        return changed
+
+    def start(self, bot):
+        self.bot = bot
+        self.beat()
+        self._task = supervisor.supervise(self._run, 'ClusterNode._run', 'ClusterNode')
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(WORKER_HEARTBEAT_SECONDS)
+            try:
+                # A peer holding the write lock would otherwise stall the loop for the busy timeout
+                changed = await asyncio.get_running_loop().run_in_executor(None, self.beat, self._stats())
+                if changed:
+                    self.bot.dispatch('cluster_ownership_changed')
+            except Exception as e:
+                logger.error("[Cluster] Heartbeat failed: %s", e)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            self.store.mark_stopped(self.worker_id)
+        finally:
+            self.store.close()
+
+
+# -- launcher ---------------------------------------------------------------------------------
+
+
+async def recommended_shards(token: str) -> int:
+    import aiohttp
+
+    base = DISCORD_API_BASE or 'https://discord.com/api/v10'
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f'{base}/gateway/bot', headers={'Authorization': f'Bot {token}'}) as response:
+            response.raise_for_status()
+            return (await response.json())['shards']
+
+
+class Launcher:
+    """Starts one `main.py` per shard range and restarts any that exit until told to stop."""
+
+    def __init__(self, shard_count: int, workers: int, restart_delay: float = RESTART_DELAY):
+        self.shard_count = shard_count
+        self.ranges = shard_ranges(shard_count, workers)
+        self.restart_delay = restart_delay
+        self.processes = {}
+        self._stopping = False
+
+    def _env(self, worker_id: int) -> dict:
+        env = dict(os.environ)
+        env.update({
+            'CLUSTER_WORKER': str(worker_id),
+            'SHARD_IDS': format_shard_ids(self.ranges[worker_id]),
+            'SHARD_COUNT': str(self.shard_count),
+        })
+        if LOG_FILE:
+            # Rotating handlers can't share a file across processes
+            root, ext = os.path.splitext(LOG_FILE)
+            env['LOG_FILE'] = f'{root}.worker{worker_id}{ext}'
+        return env
+
+    async def _supervise(self, worker_id: int):
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+        delay = self.restart_delay
+        while not self._stopping:
+            started = time.monotonic()
+            process = await asyncio.create_subprocess_exec(sys.executable, script, env=self._env(worker_id))
+            self.processes[worker_id] = process
+            logger.info("[Cluster] Worker %s (pid %s) started for shards %s",
+                        worker_id, process.pid, format_shard_ids(self.ranges[worker_id]))
+            code = await process.wait()
+            if self._stopping:
+                break
+            if time.monotonic() - started > STABLE_SECONDS:
+                delay = self.restart_delay
+            logger.warning("[Cluster] Worker %s exited with %s; restarting in %.0fs", worker_id, code, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RESTART_DELAY_MAX)
+
+    async def stop(self, timeout: float = 15.0):
+        self._stopping = True
+        running = [p for p in self.processes.values() if p.returncode is None]
+        for process in running:
+            # SIGINT lets client.run() close cleanly, which also marks the worker stopped
+            process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(p.wait() for p in running)), timeout)
+        except asyncio.TimeoutError:
+            for process in running:
+                if process.returncode is None:
+                    process.kill()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        supervisors = [loop.create_task(self._supervise(worker_id)) for worker_id in range(len(self.ranges))]
+        await stop.wait()
+        logger.info("[Cluster] Stopping %d workers", len(self.processes))
+        await self.stop()
+        for task in supervisors:
+            task.cancel()
+        await asyncio.gather(*supervisors, return_exceptions=True)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes to run')
+    parser.add_argument('--shards', type=int, default=None, help='total shards (default: ask Discord)')
+    parser.add_argument('--restart-delay', type=float, default=RESTART_DELAY, help='initial restart backoff')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    async def run():
+        shard_count = args.shards or int(os.getenv('SHARD_COUNT') or 0)
+        if not shard_count:
+            shard_count = await recommended_shards(os.environ['TOKEN'])
+        launcher = Launcher(shard_count, args.workers, args.restart_delay)
+        logger.info("[Cluster] %d shards across %d workers: %s", shard_count, len(launcher.ranges),
+                    ' | '.join(format_shard_ids(r) for r in launcher.ranges))
+        await launcher.run()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
@@ -0,0 +1,141 @@
+"""List, diff, sync or clear application commands over REST only; no gateway connection or IDENTIFY.
+
+    python command_cli.py list                   # what Discord has registered
+    python command_cli.py diff                   # local cogs vs Discord
+    python command_cli.py sync [--force]         # sync if the payloads changed
+    python command_cli.py clear                  # remove every command in the scope
+    python command_cli.py diff --global          # override the scope (default: COMMAND_SCOPE)
+    python command_cli.py sync --guild 1234567890
+
+Local payloads are built by running each extension's setup() against a bot that only collects
+app commands, so cog_load never runs: no database is opened and no background task started.
+Command definitions must therefore not depend on cog_load (e.g. choices or options filled in
+there); anything set up in cog_load is missing here and the CLI would diff against the wrong payloads.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import discord
+from discord.ext import commands
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from cluster import DISCORD_API_BASE  # noqa: E402
+from command_sync import (  # noqa: E402
+    EXTENSIONS,
+    diff_payloads,
+    local_payloads,
+    remote_payloads,
+    save_hash,
+    sync_if_changed,
+    sync_scope,
+)
+
+TOKEN = os.getenv('TOKEN')
+
+if DISCORD_API_BASE:
+    discord.http.Route.BASE = DISCORD_API_BASE.rstrip('/')
+
+
+class PayloadBot(commands.Bot):
+    """A bot that is only ever logged in over REST; adding a cog just registers its app commands.
+
+    add_cog() skips Cog._inject, so cog_load never runs and the cog's listeners are never added.
+    """
+
+    def __init__(self):
+        super().__init__(command_prefix=commands.when_mentioned, intents=discord.Intents.none(), help_command=None)
+
+    async def add_cog(self, cog: commands.Cog, **kwargs):
+        if not cog.__cog_app_commands_group__:
+            for command in cog.__cog_app_commands__:
+                self.tree.add_command(command)
+
+
+async def build_tree(bot: PayloadBot):
+    for extension in EXTENSIONS:
+        module = __import__(extension)
+        await module.setup(bot)
+
+
+def resolve_scope(tree, args) -> tuple:
+    if args.use_global:
+        return None, 'global'
+    if args.guild:
+        guild = discord.Object(id=args.guild)
+        tree.copy_global_to(guild=guild)
+        return guild, f'guild {args.guild}'
+    return sync_scope(tree)
+
+
+def describe(command) -> str:
+    kind = {1: '/', 2: 'user: ', 3: 'message: '}.get(int(command.type.value), '')
+    description = getattr(command, 'description', '')
+    return f'  {kind}{command.name:<16} {command.id}  {description}'
+
+
+async def run(args) -> int:
+    bot = PayloadBot()
+    async with bot:
+        await build_tree(bot)
+        guild, scope = resolve_scope(bot.tree, args)
+        # static_login + application_info; no websocket
+        await bot.login(TOKEN)
+
+        if args.action == 'list':
+            remote = await bot.tree.fetch_commands(guild=guild)
+            print(f'{len(remote)} commands registered ({scope}):')
+            for command in sorted(remote, key=lambda c: c.name):
+                print(describe(command))
+
+        elif args.action == 'diff':
+            remote = await remote_payloads(bot.tree, guild)
+            local = local_payloads(bot.tree, guild)
+            added, removed, changed, unchanged = diff_payloads(local, remote)
+            print(f'{scope}: {len(local)} local, {len(remote)} registered')
+            for marker, names in (('+', added), ('-', removed), ('~', changed), (' ', unchanged)):
+                for name in names:
+                    print(f'  {marker} {name}')
+            if added or removed or changed:
+                print('Out of date; run `sync` to apply.')
+                return 1
+            print('Up to date.')
+
+        elif args.action == 'sync':
+            path, count = await sync_if_changed(bot.tree, guild=guild, force=args.force)
+            if path == 'synced':
+                print(f'Synced {count} commands ({scope}).')
+            else:
+                print(f'{count} commands ({scope}) already up to date ({path}); pass --force to sync anyway.')
+
+        elif args.action == 'clear':
+            bot.tree.clear_commands(guild=guild)
+            await bot.tree.sync(guild=guild)
+            save_hash(bot.tree, guild, None)
+            print(f'Cleared every command ({scope}).')
+    return 0
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('action', choices=('list', 'diff', 'sync', 'clear'))
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument('--guild', type=int, help='guild ID to act on instead of the configured scope')
+    scope.add_argument('--global', dest='use_global', action='store_true', help='act on global commands')
+    parser.add_argument('--force', action='store_true', help='sync even if the payload hash is unchanged')
+    args = parser.parse_args(argv)
+    if not TOKEN:
+        raise SystemExit('TOKEN not set in environment')
+
+    started = time.perf_counter()
+    code = asyncio.run(run(args))
+    print(f'({time.perf_counter() - started:.2f}s)')
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import os
+
+import discord
+
+logger = logging.getLogger('cogs')
+
+# Hash of the last successfully synced command payloads, per application and scope ("global" or a guild ID)
+SYNC_STATE_PATH = os.getenv('COMMAND_SYNC_STATE') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '.command_sync.json'
+)
+
+# Commands are registered globally for every guild the bot is in. COMMAND_SCOPE=guild mirrors them
+# into GUILD only (updates are instant there), e.g. while developing against a test server
+COMMAND_GUILD = os.getenv('GUILD')
+COMMAND_SCOPE = os.getenv('COMMAND_SCOPE', 'global').lower()
+
+# Extensions main.py loads; command_cli.py builds the same command set from them offline
+EXTENSIONS = ('voice_cog', 'timer_cog', 'admin_cog')
+
+# Option fields that matter for whether Discord needs a re-sync
+_OPTION_KEYS = (
+    'name', 'type', 'description', 'required', 'choices', 'channel_types',
+    'min_value', 'max_value', 'min_length', 'max_length', 'autocomplete', 'options',
+)
+# Top-level command fields on top of those: who may see and use the command, and where
+_COMMAND_KEYS = _OPTION_KEYS + (
+    'default_member_permissions', 'dm_permission', 'contexts', 'integration_types', 'nsfw',
+    'name_localizations', 'description_localizations',
+)
+# Fields whose default isn't false/empty, so sending the default equals leaving the field out
+_DEFAULTS = {'dm_permission': True, 'integration_types': [0]}
+
+
+def _normalize(payload: dict, keys: tuple = _COMMAND_KEYS) -> dict:
+    """Reduce a local or remote command payload to the fields both sides report identically."""
+    normalized = {}
+    for key in keys:
+        value = payload.get(key)
+        # Discord omits false/empty/default fields that discord.py sends explicitly
+        if value in (None, [], {}) or value == _DEFAULTS.get(key, False):
+            continue
+        if key == 'options':
+            value = [_normalize(option, _OPTION_KEYS) for option in value]
+        elif key == 'choices':
+            value = [{'name': choice['name'], 'value': choice['value']} for choice in value]
+        elif key in ('channel_types', 'contexts', 'integration_types'):
+            value = sorted(value)
+        elif key == 'default_member_permissions':
+            # discord.py sends an int, Discord returns a string
+            value = str(value)
+        elif key.endswith('_localizations'):
+            value = {str(locale): text for locale, text in value.items()}
+        elif key == 'type' and hasattr(value, 'value'):
+            value = value.value
+        normalized[key] = value
+    normalized.setdefault('type', 1)
+    return normalized
+
+
+def local_payloads(tree: discord.app_commands.CommandTree, guild: discord.abc.Snowflake = None) -> list:
+    """Build the payloads `tree.sync(guild=guild)` would send, without any network calls."""
+    payloads = []
+    for command in tree.get_commands(guild=guild):
+        try:
+            payloads.append(command.to_dict(tree))
+        except TypeError:
+            # discord.py < 2.4 took no tree argument
+            payloads.append(command.to_dict())
+    return payloads
+
+
+async def remote_payloads(tree: discord.app_commands.CommandTree, guild=None) -> list:
+    """Fetch the registered commands as raw payloads.
+
+    AppCommand.to_dict() drops the permission fields and garbles contexts, so the raw JSON is compared instead.
+    """
+    client = tree.client
+    if guild is None:
+        return await client.http.get_global_commands(client.application_id)
+    return await client.http.get_guild_commands(client.application_id, guild.id)
+
+
+def diff_payloads(local, remote) -> tuple:
+    """Compare two payload lists by (type, name); returns (added, removed, changed, unchanged) names."""
+    def keyed(payloads):
+        return {(p.get('type', 1), p['name']): _normalize(p) for p in payloads}
+
+    local, remote = keyed(local), keyed(remote)
+    added = sorted(key[1] for key in local.keys() - remote.keys())
+    removed = sorted(key[1] for key in remote.keys() - local.keys())
+    changed = sorted(key[1] for key in local.keys() & remote.keys() if local[key] != remote[key])
+    unchanged = sorted(key[1] for key in local.keys() & remote.keys() if local[key] == remote[key])
+    return added, removed, changed, unchanged
+
+
+def sync_scope(tree: discord.app_commands.CommandTree) -> tuple:
+    """Return (guild or None, label) for where commands are synced, copying globals into GUILD if needed."""
+    if COMMAND_SCOPE != 'guild' or not COMMAND_GUILD:
+        return None, 'global'
+    guild = discord.Object(id=int(COMMAND_GUILD))
+    tree.copy_global_to(guild=guild)
+    return guild, f'guild {COMMAND_GUILD}'
+
+
+def payload_hash(payloads) -> str:
+    normalized = sorted((_normalize(p) for p in payloads), key=lambda p: (p.get('type', 1), p['name']))
+    encoded = json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _scope(tree: discord.app_commands.CommandTree, guild) -> str:
+    # Keyed by application too, so two bots (e.g. prod and staging) sharing a checkout don't mask each other
+    return f"{tree.client.application_id}:{guild.id if guild is not None else 'global'}"
+
+
+def load_state(path: str = SYNC_STATE_PATH) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_hash(tree: discord.app_commands.CommandTree, guild, digest: str, path: str = SYNC_STATE_PATH):
+    state = load_state(path)
+    if digest is None:
+        state.pop(_scope(tree, guild), None)
+    else:
+        state[_scope(tree, guild)] = digest
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+async def sync_if_changed(tree: discord.app_commands.CommandTree, guild=None, force: bool = False) -> tuple:
+    """Sync `tree` for `guild` only when its payloads changed since the last successful sync.
+
+    Returns (path, count) where path is one of:
+      'hash-match'   - local hash equals the stored hash; no API calls made
+      'remote-match' - no stored hash, but fetch_commands already matches; hash stored
+      'synced'       - payloads changed (or force=True) and tree.sync ran
+    """
+    payloads = local_payloads(tree, guild)
+    digest = payload_hash(payloads)
+
+    if not force:
+        stored = load_state().get(_scope(tree, guild))
+        if stored == digest:
+            return 'hash-match', len(payloads)
+        if stored is None:
+            remote = await remote_payloads(tree, guild)
+            if payload_hash(remote) == digest:
+                save_hash(tree, guild, digest)
+                return 'remote-match', len(remote)
+
+    synced = await tree.sync(guild=guild)
+    save_hash(tree, guild, digest)
+    return 'synced', len(synced)
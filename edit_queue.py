@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from collections import deque
+
+import discord
+
+from ratelimit import TokenBucket, retry_after
+from supervisor import supervisor
+
+logger = logging.getLogger('cogs')
+
+# Discord allows roughly 5 message edits per 5 seconds per channel
+EDIT_RATE = 5
+EDIT_PER = 5.0
+
+
+class _ChannelLane:
+    __slots__ = ('order', 'bucket', 'task')
+
+    def __init__(self, bucket: TokenBucket):
+        self.order = deque()
+        self.bucket = bucket
+        self.task = None
+
+
+class EditQueue:
+    """Coalescing message-edit pipeline.
+
+    Only the latest pending render is kept per message; submitting a new one replaces the
+    old frame (counted as dropped) without losing its place in line. Each channel drains in
+    FIFO order through its own token bucket so edits are spread across the rate-limit window.
+    Buckets outlive their lanes, so a 429 penalty still applies to the channel's next frame.
+    """
+
+    def __init__(self, rate: int = EDIT_RATE, per: float = EDIT_PER):
+        self.rate = rate
+        self.per = per
+        self._pending = {}
+        self._buckets = {}
+        self._lanes = {}
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.depth,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'rate_limited': self.rate_limited,
+            'channels': len(self._lanes),
+        }
+
+    def bucket(self, channel_id: int) -> TokenBucket:
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = self._buckets[channel_id] = TokenBucket(self.rate, self.per)
+        return bucket
+
+    def submit(self, message, **fields):
+        """Queue `message.edit(**fields)`, superseding any frame still waiting for this message."""
+        key = message.id
+        if key in self._pending:
+            self.dropped += 1
+            self._pending[key] = (message, fields)
+            return
+
+        self._pending[key] = (message, fields)
+        channel_id = message.channel.id
+        lane = self._lanes.get(channel_id)
+        if lane is None:
+            lane = self._lanes[channel_id] = _ChannelLane(self.bucket(channel_id))
+        lane.order.append(key)
+        if lane.task is None or lane.task.done():
+            lane.task = supervisor.spawn(self._drain(channel_id, lane), owner='EditQueue')
+
+    def discard(self, message_id: int) -> bool:
+        """Forget any pending frame for a message (e.g. when its timer is cancelled)."""
+        return self._pending.pop(message_id, None) is not None
+
+    async def _drain(self, channel_id: int, lane: _ChannelLane):
+        while lane.order:
+            await lane.bucket.acquire()
+            key = lane.order.popleft()
+            item = self._pending.pop(key, None)
+            if item is None:
+                continue
+            message, fields = item
+            try:
+                await message.edit(**fields)
+                self.sent += 1
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    self.rate_limited += 1
+                    lane.bucket.penalize(retry_after(e, self.per))
+                    # Retry at the front unless a newer frame already replaced this one
+                    if key not in self._pending:
+                        self._pending[key] = item
+                        lane.order.appendleft(key)
+                else:
+                    self.failed += 1
+                    logger.warning("[EditQueue] Edit failed for message %s in channel %s: %s", key, channel_id, e)
+            except Exception:
+                self.failed += 1
+                logger.exception("[EditQueue] Edit failed for message %s in channel %s", key, channel_id)
+        lane.task = None
+        if not lane.order and self._lanes.get(channel_id) is lane:
+            del self._lanes[channel_id]
+
+    async def close(self):
+        tasks = [lane.task for lane in self._lanes.values() if lane.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._lanes.clear()
+        self._pending.clear()
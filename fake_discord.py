@@ -0,0 +1,559 @@
+"""Local stand-in for Discord's REST API and gateway, for offline load tests and benchmarks.
+
+Implements just the routes and gateway events the cogs use, against an in-memory guild, with
+per-route rate-limit buckets that answer with real 429s and rate-limit headers. Point discord.py
+at it with `FakeDiscord.patch_client()` before the bot logs in; see loadtest.py.
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from collections import defaultdict
+
+import yarl
+from aiohttp import WSMsgType, web
+
+DISCORD_EPOCH = 1420070400000
+
+# (limit, window seconds) per route template, roughly matching Discord's observed buckets
+DEFAULT_LIMITS = {
+    'PATCH /channels/{channel_id}/messages/{message_id}': (5, 5.0),
+    'POST /channels/{channel_id}/messages': (5, 5.0),
+    'POST /guilds/{guild_id}/channels': (10, 10.0),
+    'PATCH /channels/{channel_id}': (2, 600.0),
+    'DELETE /channels/{channel_id}': (5, 5.0),
+    'PATCH /guilds/{guild_id}/members/{user_id}': (10, 10.0),
+    'POST /users/@me/channels': (5, 5.0),
+}
+FALLBACK_LIMIT = (50, 1.0)
+
+# Guilds above this many members are "large": GUILD_CREATE omits offline members
+LARGE_THRESHOLD = 250
+MEMBER_CHUNK_SIZE = 1000
+
+# Route templates in match order; the first path segment after a major resource is its bucket key
+ROUTES = [
+    ('GET', '/users/@me', 'get_me'),
+    ('GET', '/oauth2/applications/@me', 'get_application'),
+    ('GET', '/gateway/bot', 'get_gateway_bot'),
+    ('GET', '/gateway', 'get_gateway'),
+    ('GET', '/applications/{application_id}/commands', 'get_commands'),
+    ('PUT', '/applications/{application_id}/commands', 'put_commands'),
+    ('GET', '/applications/{application_id}/guilds/{guild_id}/commands', 'get_commands'),
+    ('PUT', '/applications/{application_id}/guilds/{guild_id}/commands', 'put_commands'),
+    ('POST', '/interactions/{interaction_id}/{token}/callback', 'interaction_callback'),
+    ('POST', '/webhooks/{application_id}/{token}', 'followup'),
+    ('PATCH', '/webhooks/{application_id}/{token}/messages/@original', 'edit_original'),
+    ('PATCH', '/webhooks/{application_id}/{token}/messages/{message_id}', 'edit_original'),
+    ('GET', '/channels/{channel_id}', 'get_channel'),
+    ('PATCH', '/channels/{channel_id}', 'edit_channel'),
+    ('DELETE', '/channels/{channel_id}', 'delete_channel'),
+    ('POST', '/channels/{channel_id}/messages', 'create_message'),
+    ('PATCH', '/channels/{channel_id}/messages/{message_id}', 'edit_message'),
+    ('POST', '/guilds/{guild_id}/channels', 'create_channel'),
+    ('PATCH', '/guilds/{guild_id}/members/{user_id}', 'edit_member'),
+    ('GET', '/guilds/{guild_id}/members/{user_id}', 'get_member'),
+    ('POST', '/users/@me/channels', 'create_dm'),
+    ('GET', '/users/{user_id}', 'get_user'),
+]
+MAJOR_PARAMETERS = ('channel_id', 'guild_id', 'application_id', 'interaction_id')
+
+
+def _compile(template: str):
+    pattern = re.escape(template)
+    pattern = re.sub(r'\\\{(\w+)\\\}', r'(?P<\1>[^/]+)', pattern)
+    return re.compile(f'^{pattern}$')
+
+
+_COMPILED = [(method, template, _compile(template), handler) for method, template, handler in ROUTES]
+
+
+class _Bucket:
+    __slots__ = ('limit', 'window', 'remaining', 'reset_at')
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+
+
+def _json_response(payload, status: int = 200, headers: dict = None) -> web.Response:
+    # discord.py only parses bodies whose content-type is exactly application/json (no charset)
+    return web.Response(
+        body=json.dumps(payload).encode('utf-8'), status=status, headers=headers, content_type='application/json'
+    )
+
+
+class FakeDiscord:
+    """In-memory Discord: one guild, a category, text channels for LFG/timers and `members` users in voice."""
+
+    def __init__(
+        self,
+        members: int = 50,
+        idle_members: int = 0,
+        latency: float = 0.02,
+        limits: dict = None,
+        chaos_429: float = 0.0,
+        shard_count: int = 1,
+        seed: int = 0
+    ):
+        self.latency = latency
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.chaos_429 = chaos_429
+        self.shard_count = shard_count
+        self.random = random.Random(seed)
+        self._counter = itertools.count(1)
+
+        self.app_id = self.snowflake()
+        self.bot_user = self._user_payload(self.app_id, 'loadtest-bot', bot=True)
+        self.guild_id = self.snowflake()
+        self.users = {}
+        self.channels = {}
+        self.messages = {}
+        self.voice_states = {}
+        self.commands = defaultdict(list)
+        self.sockets = {}
+
+        self.category_id = self._add_channel(4, 'voice rooms')['id']
+        self.lfg_channel_id = self._add_channel(0, 'lfg')['id']
+        self.timer_channel_id = self._add_channel(0, 'timers')['id']
+        self.display_channel_id = self._add_channel(0, 'countdowns')['id']
+        self.lobby_channel_id = self._add_channel(2, 'lobby')['id']
+        for i in range(members):
+            user = self._user_payload(self.snowflake(), f'member{i}')
+            self.users[int(user['id'])] = user
+            self.voice_states[int(user['id'])] = int(self.lobby_channel_id)
+        # Members who are in the guild but not in voice; they only matter for chunking and cache size
+        for i in range(idle_members):
+            user = self._user_payload(self.snowflake(), f'idle{i}')
+            self.users[int(user['id'])] = user
+
+        # Observations for reports
+        self.calls = []
+        self.calls_by_route = defaultdict(int)
+        self.rate_limited_by_route = defaultdict(int)
+        self.interaction_acks = {}
+        self.interactions_sent = {}
+        self.edits = []
+
+        self._buckets = {}
+        self.runner = None
+        self.base_url = None
+
+    # -- helpers ---------------------------------------------------------------------------
+
+    def snowflake(self) -> str:
+        ms = int(time.time() * 1000) - DISCORD_EPOCH
+        return str((ms << 22) | (next(self._counter) & 0x3FFFFF))
+
+    @staticmethod
+    def _user_payload(user_id, name: str, bot: bool = False) -> dict:
+        return {
+            'id': str(user_id), 'username': name, 'global_name': name, 'discriminator': '0',
+            'avatar': None, 'bot': bot, 'public_flags': 0,
+        }
+
+    def _add_channel(self, channel_type: int, name: str, parent_id: str = None, **extra) -> dict:
+        channel = {
+            'id': self.snowflake(), 'type': channel_type, 'guild_id': str(self.guild_id), 'name': name,
+            'position': len(self.channels), 'permission_overwrites': [], 'nsfw': False,
+            'parent_id': parent_id,
+        }
+        if channel_type == 2:
+            channel.update({'bitrate': 64000, 'user_limit': 0, 'rtc_region': None})
+        channel.update(extra)
+        self.channels[int(channel['id'])] = channel
+        return channel
+
+    def _member_payload(self, user_id: int) -> dict:
+        return {
+            'user': self.users.get(user_id) or self.bot_user, 'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00',
+            'deaf': False, 'mute': False, 'flags': 0, 'nick': None, 'avatar': None,
+        }
+
+    def _voice_state_payload(self, user_id: int, channel_id) -> dict:
+        return {
+            'guild_id': str(self.guild_id), 'channel_id': str(channel_id) if channel_id else None,
+            'user_id': str(user_id), 'member': self._member_payload(user_id), 'session_id': f'session-{user_id}',
+            'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False, 'self_video': False,
+            'suppress': False, 'request_to_speak_timestamp': None,
+        }
+
+    def guild_payload(self) -> dict:
+        guild_id = str(self.guild_id)
+        # Like Discord, large guilds only ship the bot and members in voice; the rest must be chunked
+        large = len(self.users) + 1 > LARGE_THRESHOLD
+        listed = self.voice_states if large else self.users
+        return {
+            'id': guild_id, 'name': 'loadtest', 'icon': None, 'splash': None, 'discovery_splash': None,
+            'owner_id': self.bot_user['id'], 'afk_channel_id': None, 'afk_timeout': 300,
+            'verification_level': 0, 'default_message_notifications': 0, 'explicit_content_filter': 0,
+            'roles': [{
+                'id': guild_id, 'name': '@everyone', 'color': 0, 'hoist': False, 'position': 0,
+                'permissions': str((1 << 53) - 1), 'managed': False, 'mentionable': False,
+            }],
+            'emojis': [], 'stickers': [], 'features': [], 'mfa_level': 0, 'application_id': None,
+            'system_channel_id': None, 'system_channel_flags': 0, 'rules_channel_id': None,
+            'joined_at': '2024-01-01T00:00:00+00:00', 'large': large, 'unavailable': False,
+            'member_count': len(self.users) + 1,
+            'voice_states': [
+                self._voice_state_payload(user_id, channel_id) for user_id, channel_id in self.voice_states.items()
+            ],
+            'members': [self._member_payload(int(self.bot_user['id']))] + [
+                self._member_payload(user_id) for user_id in listed
+            ],
+            'channels': list(self.channels.values()), 'threads': [], 'presences': [],
+            'max_members': 500000, 'vanity_url_code': None, 'description': None, 'banner': None,
+            'premium_tier': 0, 'premium_subscription_count': 0, 'preferred_locale': 'en-US',
+            'public_updates_channel_id': None, 'nsfw_level': 0, 'stage_instances': [],
+            'guild_scheduled_events': [], 'premium_progress_bar_enabled': False, 'soundboard_sounds': [],
+        }
+
+    def _message_payload(self, channel_id, content: str = None, embeds=None, message_id: str = None) -> dict:
+        return {
+            'id': message_id or self.snowflake(), 'channel_id': str(channel_id), 'guild_id': str(self.guild_id),
+            'author': self.bot_user, 'content': content or '', 'timestamp': '2024-01-01T00:00:00+00:00',
+            'edited_timestamp': None, 'tts': False, 'mention_everyone': False, 'mentions': [],
+            'mention_roles': [], 'attachments': [], 'embeds': embeds or [], 'pinned': False, 'type': 0,
+            'flags': 0, 'components': [],
+        }
+
+    # -- server lifecycle ------------------------------------------------------------------
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_get('/gateway', self._gateway)
+        app.router.add_route('*', '/api/v10/{tail:.*}', self._rest)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f'http://{host}:{port}'
+        return self.base_url
+
+    async def stop(self):
+        for ws in list(self.sockets.values()):
+            await ws.close()
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def patch_client(self):
+        """Redirect discord.py's REST base URL and default gateway to this server."""
+        import discord.gateway
+        import discord.http
+
+        discord.http.Route.BASE = f'{self.base_url}/api/v10'
+        discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(f'{self.base_url.replace("http", "ws")}/gateway')
+
+    # -- rate limiting ---------------------------------------------------------------------
+
+    def _check_rate_limit(self, route_key: str, params: dict):
+        limit, window = self.limits.get(route_key, FALLBACK_LIMIT)
+        major = tuple(params.get(name) for name in MAJOR_PARAMETERS if name in params)
+        key = (route_key, major)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(limit, window)
+        now = time.monotonic()
+        if now >= bucket.reset_at:
+            bucket.remaining = bucket.limit
+            bucket.reset_at = now + bucket.window
+        reset_after = max(0.0, bucket.reset_at - now)
+        headers = {
+            'X-RateLimit-Limit': str(bucket.limit),
+            'X-RateLimit-Bucket': f'{abs(hash(route_key)):x}',
+            'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+            'X-RateLimit-Reset': f'{time.time() + reset_after:.3f}',
+            'Via': '1.1 google',
+        }
+        if bucket.remaining <= 0 or (self.chaos_429 and self.random.random() < self.chaos_429):
+            headers['X-RateLimit-Remaining'] = '0'
+            headers['X-RateLimit-Scope'] = 'user'
+            return False, reset_after or 0.05, headers
+        bucket.remaining -= 1
+        headers['X-RateLimit-Remaining'] = str(bucket.remaining)
+        return True, 0.0, headers
+
+    # -- REST ------------------------------------------------------------------------------
+
+    async def _rest(self, request: web.Request) -> web.StreamResponse:
+        path = '/' + request.match_info['tail']
+        for method, template, pattern, handler_name in _COMPILED:
+            if method != request.method:
+                continue
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return _json_response({'message': f'Unknown route {request.method} {path}', 'code': 0}, status=404)
+
+        route_key = f'{method} {template}'
+        params = match.groupdict()
+        self.calls.append((time.monotonic(), route_key))
+        self.calls_by_route[route_key] += 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        allowed, retry_after, headers = self._check_rate_limit(route_key, params)
+        if not allowed:
+            self.rate_limited_by_route[route_key] += 1
+            body = {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': False}
+            return _json_response(body, status=429, headers=headers)
+
+        body = None
+        if request.can_read_body:
+            try:
+                body = await request.json()
+            except (ValueError, UnicodeDecodeError):
+                body = None
+        result = getattr(self, f'_handle_{handler_name}')(params, body or {}, request)
+        if result is None:
+            return web.Response(status=204, headers=headers)
+        status, payload = result
+        return _json_response(payload, status=status, headers=headers)
+
+    def _handle_get_me(self, params, body, request):
+        return 200, self.bot_user
+
+    def _handle_get_application(self, params, body, request):
+        return 200, {
+            'id': self.app_id, 'name': 'loadtest', 'icon': None, 'description': '', 'rpc_origins': [],
+            'bot_public': True, 'bot_require_code_grant': False, 'owner': self.bot_user, 'verify_key': '0' * 64,
+            'flags': 0, 'team': None, 'summary': '', 'interactions_endpoint_url': None,
+        }
+
+    def _handle_get_gateway_bot(self, params, body, request):
+        return 200, {
+            'url': f'{self.base_url.replace("http", "ws")}/gateway', 'shards': self.shard_count,
+            'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0, 'max_concurrency': 16},
+        }
+
+    def _handle_get_gateway(self, params, body, request):
+        return 200, {'url': f'{self.base_url.replace("http", "ws")}/gateway'}
+
+    def _scope(self, params) -> str:
+        return params.get('guild_id', 'global')
+
+    def _handle_get_commands(self, params, body, request):
+        return 200, self.commands[self._scope(params)]
+
+    def _handle_put_commands(self, params, body, request):
+        registered = []
+        for command in body or []:
+            command = dict(command, id=self.snowflake(), application_id=self.app_id, version='1')
+            if 'guild_id' in params:
+                command['guild_id'] = params['guild_id']
+            registered.append(command)
+        self.commands[self._scope(params)] = registered
+        return 200, registered
+
+    def _handle_interaction_callback(self, params, body, request):
+        interaction_id = params['interaction_id']
+        self.interaction_acks.setdefault(interaction_id, time.monotonic())
+        data = body.get('data') or {}
+        message = None
+        if body.get('type') == 4:
+            message = self._message_payload(0, data.get('content'), data.get('embeds'))
+        return 200, {
+            'interaction': {
+                'id': interaction_id, 'type': 2,
+                'response_message_loading': body.get('type') == 5,
+                'response_message_ephemeral': bool((data.get('flags') or 0) & 64),
+            },
+            'resource': {'type': body.get('type', 4), 'message': message},
+        }
+
+    def _handle_followup(self, params, body, request):
+        return 200, self._message_payload(0, body.get('content'), body.get('embeds'))
+
+    def _handle_edit_original(self, params, body, request):
+        return 200, self._message_payload(0, body.get('content'), body.get('embeds'))
+
+    def _handle_get_channel(self, params, body, request):
+        channel = self.channels.get(int(params['channel_id']))
+        if channel is None:
+            return 404, {'message': 'Unknown Channel', 'code': 10003}
+        return 200, channel
+
+    def _handle_edit_channel(self, params, body, request):
+        channel = self.channels.get(int(params['channel_id']))
+        if channel is None:
+            return 404, {'message': 'Unknown Channel', 'code': 10003}
+        for key in ('name', 'user_limit', 'permission_overwrites', 'parent_id', 'position', 'bitrate'):
+            if key in body:
+                channel[key] = body[key]
+        self.dispatch('CHANNEL_UPDATE', channel)
+        return 200, channel
+
+    def _handle_delete_channel(self, params, body, request):
+        channel = self.channels.pop(int(params['channel_id']), None)
+        if channel is None:
+            return 404, {'message': 'Unknown Channel', 'code': 10003}
+        self.dispatch('CHANNEL_DELETE', channel)
+        return 200, channel
+
+    def _handle_create_channel(self, params, body, request):
+        channel = self._add_channel(
+            body.get('type', 0), body.get('name', 'channel'), body.get('parent_id'),
+            user_limit=body.get('user_limit') or 0, permission_overwrites=body.get('permission_overwrites') or [],
+        )
+        self.dispatch('CHANNEL_CREATE', channel)
+        return 201, channel
+
+    def _handle_create_message(self, params, body, request):
+        message = self._message_payload(params['channel_id'], body.get('content'), body.get('embeds'))
+        self.messages[int(message['id'])] = message
+        return 200, message
+
+    def _handle_edit_message(self, params, body, request):
+        message = self.messages.get(int(params['message_id']))
+        if message is None:
+            message = self._message_payload(params['channel_id'], message_id=params['message_id'])
+            self.messages[int(message['id'])] = message
+        if 'embeds' in body:
+            message['embeds'] = body['embeds'] or []
+        if 'content' in body:
+            message['content'] = body['content'] or ''
+        self.edits.append((time.monotonic(), time.time(), int(message['id']), message['embeds']))
+        return 200, message
+
+    def _handle_edit_member(self, params, body, request):
+        user_id = int(params['user_id'])
+        if user_id not in self.users:
+            return 404, {'message': 'Unknown Member', 'code': 10007}
+        if 'channel_id' in body:
+            if user_id not in self.voice_states:
+                return 400, {'message': 'Target user is not connected to voice.', 'code': 40032}
+            self.move_voice(user_id, body['channel_id'])
+        return 200, self._member_payload(user_id)
+
+    def _handle_get_member(self, params, body, request):
+        user_id = int(params['user_id'])
+        if user_id not in self.users:
+            return 404, {'message': 'Unknown Member', 'code': 10007}
+        return 200, self._member_payload(user_id)
+
+    def _handle_create_dm(self, params, body, request):
+        user = self.users.get(int(body.get('recipient_id', 0)))
+        if user is None:
+            return 400, {'message': 'Invalid Recipient', 'code': 50033}
+        return 200, {'id': self.snowflake(), 'type': 1, 'recipients': [user], 'last_message_id': None}
+
+    def _handle_get_user(self, params, body, request):
+        user = self.users.get(int(params['user_id']))
+        if user is None:
+            return 404, {'message': 'Unknown User', 'code': 10013}
+        return 200, user
+
+    # -- gateway ---------------------------------------------------------------------------
+
+    async def _gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        sequence = itertools.count(1)
+        shard = [0, 1]
+
+        async def send(op: int, data, event: str = None):
+            payload = {'op': op, 'd': data, 's': next(sequence) if op == 0 else None, 't': event}
+            # Plain text frames: discord.py only decompresses binary frames
+            await ws.send_str(json.dumps(payload))
+
+        ws._fake_send = send
+        await send(10, {'heartbeat_interval': 41250})
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                break
+            payload = json.loads(msg.data)
+            op = payload.get('op')
+            if op == 1:
+                await ws.send_str(json.dumps({'op': 11, 'd': None, 's': None, 't': None}))
+            elif op == 2:
+                shard = payload['d'].get('shard') or [0, 1]
+                self.sockets[tuple(shard)] = ws
+                on_shard = (int(self.guild_id) >> 22) % shard[1] == shard[0]
+                await send(0, {
+                    'v': 10, 'user': self.bot_user, 'session_id': f'session-{shard[0]}',
+                    'resume_gateway_url': f'{self.base_url.replace("http", "ws")}/gateway',
+                    'guilds': [{'id': str(self.guild_id), 'unavailable': True}] if on_shard else [],
+                    'application': {'id': self.app_id, 'flags': 0}, 'shard': shard,
+                }, 'READY')
+                if on_shard:
+                    await send(0, self.guild_payload(), 'GUILD_CREATE')
+            elif op == 6:
+                await send(9, False)
+            elif op == 8:
+                await self._send_member_chunks(send, payload['d'])
+        self.sockets.pop(tuple(shard), None)
+        return ws
+
+    async def _send_member_chunks(self, send, request: dict):
+        user_ids = list(self.users)
+        chunks = [user_ids[i:i + MEMBER_CHUNK_SIZE] for i in range(0, len(user_ids), MEMBER_CHUNK_SIZE)] or [[]]
+        for index, chunk in enumerate(chunks):
+            await send(0, {
+                'guild_id': str(self.guild_id), 'members': [self._member_payload(user_id) for user_id in chunk],
+                'chunk_index': index, 'chunk_count': len(chunks), 'not_found': [], 'nonce': request.get('nonce'),
+            }, 'GUILD_MEMBERS_CHUNK')
+
+    def _socket_for_guild(self):
+        for (shard_id, shard_count), ws in self.sockets.items():
+            if (int(self.guild_id) >> 22) % shard_count == shard_id:
+                return ws
+        return None
+
+    def dispatch(self, event: str, data: dict):
+        """Push a gateway dispatch to whichever shard owns the guild."""
+        ws = self._socket_for_guild()
+        if ws is not None and not ws.closed:
+            asyncio.get_running_loop().create_task(ws._fake_send(0, data, event))
+
+    def move_voice(self, user_id: int, channel_id):
+        """Move a member (channel_id None disconnects them) and dispatch VOICE_STATE_UPDATE."""
+        if channel_id is None:
+            self.voice_states.pop(user_id, None)
+        else:
+            self.voice_states[user_id] = int(channel_id)
+        self.dispatch('VOICE_STATE_UPDATE', self._voice_state_payload(user_id, channel_id))
+
+    def send_command(self, name: str, user_id: int, channel_id, options: dict = None) -> str:
+        """Dispatch INTERACTION_CREATE for a slash command and return the interaction ID."""
+        interaction_id = self.snowflake()
+        option_types = {bool: 5, int: 4, str: 3}
+        data = {
+            'id': self.snowflake(), 'name': name, 'type': 1, 'guild_id': str(self.guild_id),
+            'options': [
+                {'name': key, 'type': option_types[type(value)], 'value': value}
+                for key, value in (options or {}).items()
+            ],
+        }
+        self.interactions_sent[interaction_id] = time.monotonic()
+        self.dispatch('INTERACTION_CREATE', {
+            'id': interaction_id, 'application_id': self.app_id, 'type': 2, 'data': data,
+            'guild_id': str(self.guild_id), 'channel_id': str(channel_id),
+            'channel': {'id': str(channel_id), 'type': 0, 'guild_id': str(self.guild_id)},
+            'member': dict(self._member_payload(user_id), permissions=str((1 << 53) - 1)),
+            'token': f'token-{interaction_id}', 'version': 1, 'locale': 'en-US', 'guild_locale': 'en-US',
+            'app_permissions': str((1 << 53) - 1), 'entitlements': [], 'authorizing_integration_owners': {},
+            'context': 0, 'attachment_size_limit': 8388608,
+        })
+        return interaction_id
+
+    # -- reporting -------------------------------------------------------------------------
+
+    def calls_per_second(self, since: float = 0.0) -> float:
+        stamps = [stamp for stamp, _ in self.calls if stamp >= since]
+        if len(stamps) < 2:
+            return float(len(stamps))
+        return len(stamps) / max(1e-6, stamps[-1] - stamps[0])
+
+    def ack_latencies(self, since: float = 0.0) -> list:
+        return [
+            self.interaction_acks[iid] - sent
+            for iid, sent in self.interactions_sent.items()
+            if iid in self.interaction_acks and sent >= since
+        ]
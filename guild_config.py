@@ -0,0 +1,90 @@
+import os
+
+from records import GuildConfig
+from store import GuildConfigStore
+
+# Single-guild deployments configured through the environment keep working: GUILD falls back to
+# these settings until an admin saves its own with /config
+GUILD = os.getenv('GUILD')
+ENV_DEFAULTS = {
+    'category_id': os.getenv('CATEGORY'),
+    'lfg_channel_id': os.getenv('LFG_CHANNEL'),
+    'timer_channel_id': os.getenv('TIMER_CHANNEL'),
+    'display_channel_id': os.getenv('TIMER_CHANNEL_DISPLAY'),
+}
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class GuildConfigCache:
+    """Read-through cache over GuildConfigStore.
+
+    Lookups on the /request and /set paths are a dict hit after a guild's first use; updates are
+    written through to SQLite and swapped into the cache, so readers never see a half-applied change.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.store = None
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _open(self) -> GuildConfigStore:
+        if self.store is None:
+            self.store = GuildConfigStore(self.path)
+        return self.store
+
+    def _env_default(self, guild_id: int) -> GuildConfig:
+        if GUILD and str(guild_id) == GUILD:
+            return GuildConfig(guild_id, **{name: _as_id(value) for name, value in ENV_DEFAULTS.items()})
+        return GuildConfig(guild_id)
+
+    def get(self, guild_id: int) -> GuildConfig:
+        """Settings for `guild_id`; unconfigured guilds get a config with every field None."""
+        config = self._cache.get(guild_id)
+        if config is not None:
+            self.hits += 1
+            return config
+        self.misses += 1
+        row = self._open().get(guild_id)
+        config = GuildConfig(*row) if row else self._env_default(guild_id)
+        self._cache[guild_id] = config
+        return config
+
+    def update(self, guild_id: int, **fields) -> GuildConfig:
+        unknown = set(fields) - set(GuildConfig.FIELDS)
+        if unknown:
+            raise ValueError(f'Unknown guild setting(s): {", ".join(sorted(unknown))}')
+        config = self.get(guild_id).replace(**fields)
+        self._open().upsert(config.as_row())
+        self._cache[guild_id] = config
+        return config
+
+    def invalidate(self, guild_id: int = None):
+        """Drop one guild (or every guild) from the cache so the next lookup rereads the store."""
+        if guild_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(guild_id, None)
+
+    def configured(self) -> list:
+        """Every guild with stored settings, plus the environment's GUILD if it has none stored."""
+        configs = {row[0]: GuildConfig(*row) for row in self._open().load_all()}
+        if GUILD and _as_id(GUILD) not in configs:
+            configs[_as_id(GUILD)] = self._env_default(_as_id(GUILD))
+        return list(configs.values())
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+
+# Shared by every cog
+guild_configs = GuildConfigCache()
@@ -0,0 +1,418 @@
+"""Offline load tests: drive the real bot and cogs against fake_discord.py.
+
+    python loadtest.py timers --count 500 --duration 30
+    python loadtest.py requests --count 50
+    python loadtest.py voice-storm --count 20 --rounds 10
+    python loadtest.py reservations --count 30
+    python loadtest.py all --json
+    python loadtest.py startup --idle-members 50000 [--lean]
+    python loadtest.py cluster --count 20
+
+Every run reports time-to-ready and RSS after READY first; `startup` stops there, so running it with
+and without --lean compares the default and lean cache configurations.
+`cluster` instead runs cluster.py with two single-shard workers as subprocesses, kills the worker
+whose shard holds the guild mid-countdown and checks the survivor keeps those timers going.
+Reports event-loop lag, API calls per second, 429s, ack latency, timer drift and memory.
+The fake server runs in the same process, so absolute numbers include its overhead; compare
+runs against each other rather than against production.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import resource
+import signal
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from fake_discord import FakeDiscord
+
+SCENARIOS = ('timers', 'requests', 'voice-storm', 'reservations')
+# Shortened reservation window so the scenario finishes within a few minutes
+RESERVE_LEAD = 45
+RESERVE_READY = 5
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LagSampler:
+    """Measures how late a short sleep wakes up, i.e. event-loop scheduling lag."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def reset(self):
+        self.samples = []
+
+
+def configure_environment(fake: FakeDiscord, workdir: str, grace: float, lean: bool = False):
+    """Everything the bot reads from the environment at import time, pointing at the fake guild."""
+    os.environ.update({
+        'TOKEN': 'loadtest-token',
+        'GUILD': str(fake.guild_id),
+        'CATEGORY': str(fake.category_id),
+        'LFG_CHANNEL': str(fake.lfg_channel_id),
+        'TIMER_CHANNEL': str(fake.timer_channel_id),
+        'TIMER_CHANNEL_DISPLAY': str(fake.display_channel_id),
+        'BOT_DB': os.path.join(workdir, 'bot.db'),
+        'COMMAND_SYNC_STATE': os.path.join(workdir, 'command_sync.json'),
+        'LOG_FILE': os.path.join(workdir, 'log.log'),
+        'VOICE_GRACE_SECONDS': str(grace),
+        'VOICE_MIN_LIFETIME': '0',
+        'VOICE_RESERVE_LEAD': str(RESERVE_LEAD),
+        'VOICE_RESERVE_READY': str(RESERVE_READY),
+        'LEAN_MODE': '1' if lean else '0',
+    })
+
+
+async def wait_for(predicate, timeout: float, interval: float = 0.05) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(interval)
+    return predicate()
+
+
+def _parse_remaining(embeds) -> int:
+    for embed in embeds or []:
+        for field in embed.get('fields', []):
+            if field.get('name') == 'Time Remaining':
+                match = re.fullmatch(r'(\d+):(\d{2}):(\d{2})', field.get('value', ''))
+                if match:
+                    hours, minutes, seconds = map(int, match.groups())
+                    return hours * 3600 + minutes * 60 + seconds
+    return None
+
+
+def _parse_target(embeds) -> float:
+    for embed in embeds or []:
+        for field in embed.get('fields', []):
+            if field.get('name') == 'Ends At (UTC)':
+                dt = datetime.strptime(field['value'], '%Y-%m-%d %H:%M:%S UTC').replace(tzinfo=timezone.utc)
+                return dt.timestamp()
+    return None
+
+
+async def scenario_timers(fake: FakeDiscord, client, args) -> dict:
+    """Fire `count` concurrent /set commands in live mode and watch the countdown edits."""
+    users = list(fake.users)
+    sent = time.monotonic()
+    for i in range(args.count):
+        fake.send_command('set', users[i % len(users)], fake.timer_channel_id, {'minutes': 5, 'mode': 'live'})
+    await wait_for(lambda: len(fake.messages) >= args.count, timeout=60)
+    started = time.monotonic()
+    await asyncio.sleep(args.duration)
+
+    targets = {message_id: _parse_target(message['embeds']) for message_id, message in fake.messages.items()}
+    drift = []
+    for stamp, wall, message_id, embeds in fake.edits:
+        if stamp < started:
+            continue
+        shown = _parse_remaining(embeds)
+        target = targets.get(message_id)
+        if shown is None or target is None:
+            continue
+        drift.append(abs(shown - (target - wall)))
+    edited = {message_id for stamp, _, message_id, _ in fake.edits if stamp >= started}
+    acks = fake.ack_latencies(since=sent)
+    return {
+        'timers_created': len(fake.messages),
+        'edits': sum(1 for stamp, *_ in fake.edits if stamp >= started),
+        'timers_refreshed': len(edited),
+        'drift_mean_s': statistics.fmean(drift) if drift else 0.0,
+        'drift_p95_s': _percentile(drift, 0.95),
+        'drift_max_s': max(drift) if drift else 0.0,
+        'ack_p50_ms': _percentile(acks, 0.5) * 1000,
+        'ack_p99_ms': _percentile(acks, 0.99) * 1000,
+    }
+
+
+async def scenario_requests(fake: FakeDiscord, client, args) -> dict:
+    """Burst `count` /request commands from members sitting in the lobby."""
+    users = [user_id for user_id in fake.users if user_id in fake.voice_states][:args.count]
+    voice_cog = client.get_cog('VoiceCog')
+    tracked_before = len(voice_cog.created_voice_channels)
+    started = time.monotonic()
+    for i, user_id in enumerate(users):
+        fake.send_command('request', user_id, fake.lfg_channel_id, {'channel_name': f'squad-{i}', 'capacity': 5})
+    # Queued requests answer by editing their status message, so wait on the channels rather than follow-ups
+    await wait_for(
+        lambda: len(voice_cog.created_voice_channels) - tracked_before >= len(users) and not voice_cog.requests.depth,
+        timeout=120
+    )
+    acks = fake.ack_latencies(since=started)
+    return {
+        'requests': len(users),
+        'elapsed_s': time.monotonic() - started,
+        'channels_created': fake.calls_by_route['POST /guilds/{guild_id}/channels'],
+        'create_429s': fake.rate_limited_by_route['POST /guilds/{guild_id}/channels'],
+        'queue_status_edits': fake.calls_by_route['PATCH /webhooks/{application_id}/{token}/messages/@original'],
+        'channels_claimed': fake.calls_by_route['PATCH /channels/{channel_id}'],
+        'members_moved': fake.calls_by_route['PATCH /guilds/{guild_id}/members/{user_id}'],
+        'ack_p50_ms': _percentile(acks, 0.5) * 1000,
+        'ack_p99_ms': _percentile(acks, 0.99) * 1000,
+        'ack_over_3s': sum(1 for latency in acks if latency > 3.0),
+    }
+
+
+async def scenario_voice_storm(fake: FakeDiscord, client, args) -> dict:
+    """Create channels, then flap members in and out of them and finally empty them all."""
+    await scenario_requests(fake, client, args)
+    voice_cog = client.get_cog('VoiceCog')
+    tracked = set(voice_cog.created_voice_channels)
+    occupants = {user_id: channel_id for user_id, channel_id in fake.voice_states.items() if channel_id in tracked}
+
+    deletes_before = fake.calls_by_route['DELETE /channels/{channel_id}']
+    events = 0
+    for _ in range(args.rounds):
+        for user_id, channel_id in occupants.items():
+            fake.move_voice(user_id, fake.lobby_channel_id)
+            fake.move_voice(user_id, channel_id)
+            events += 2
+        await asyncio.sleep(0)
+    for user_id in occupants:
+        fake.move_voice(user_id, fake.lobby_channel_id)
+        events += 1
+
+    await wait_for(lambda: not voice_cog.created_voice_channels, timeout=args.grace + 30)
+    return {
+        'voice_events': events,
+        'channels_tracked': len(tracked),
+        'channel_deletes': fake.calls_by_route['DELETE /channels/{channel_id}'] - deletes_before,
+        'channels_left': len(voice_cog.created_voice_channels),
+    }
+
+
+async def scenario_reservations(fake: FakeDiscord, client, args) -> dict:
+    """Book `count` channels for the same start time and check they are made spread out and open on time.
+
+    Moving everyone in at the start is bound by the per-guild member-edit limit (10 per 10s in the fake).
+    """
+    users = [user_id for user_id in fake.users if user_id in fake.voice_states][:args.count]
+    voice_cog = client.get_cog('VoiceCog')
+    now = datetime.now(tz=timezone.utc)
+    start = (now + timedelta(seconds=RESERVE_LEAD + 60)).replace(second=0, microsecond=0)
+    for i, user_id in enumerate(users):
+        fake.send_command('reserve', user_id, fake.lfg_channel_id, {
+            'channel_name': f'booked-{i}', 'start': start.strftime('%H:%M')
+        })
+    await wait_for(lambda: len(voice_cog.reservations) >= len(users), timeout=30)
+    booked = dict(voice_cog.reservations)
+
+    await wait_for(lambda: not voice_cog.reservations, timeout=(start - now).total_seconds() + 30)
+    opened_at = datetime.now(tz=timezone.utc)
+    created = [
+        voice_cog.created_voice_channels[record.channel_id]['created_at'].timestamp()
+        for record in booked.values() if record.channel_id in voice_cog.created_voice_channels
+    ]
+    moved = sum(1 for record in booked.values() if fake.voice_states.get(record.creator_id) == record.channel_id)
+    return {
+        'reservations': len(booked),
+        'channels_ready': len(created),
+        'create_spread_s': max(created) - min(created) if created else 0.0,
+        'last_ready_before_start_s': start.timestamp() - max(created) if created else 0.0,
+        'creators_moved': moved,
+        'opened_after_start_s': (opened_at - start).total_seconds(),
+        'create_429s': fake.rate_limited_by_route['POST /guilds/{guild_id}/channels'],
+    }
+
+
+async def run(args) -> dict:
+    fake = FakeDiscord(
+        members=max(args.members, args.count), idle_members=args.idle_members,
+        latency=args.latency, chaos_429=args.chaos_429
+    )
+    workdir = tempfile.mkdtemp(prefix='voicebot-loadtest-')
+    configure_environment(fake, workdir, args.grace, args.lean)
+
+    import main  # noqa: E402 - reads the environment configured above
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    await fake.start()
+    fake.patch_client()
+    sampler = LagSampler()
+    sampler.start()
+
+    client = main.client
+    rss_before = _rss_mb()
+    booted = time.monotonic()
+    bot_task = asyncio.get_running_loop().create_task(client.start(os.environ['TOKEN']))
+    if not await wait_for(lambda: client.is_ready() or bot_task.done(), timeout=300) or bot_task.done():
+        await fake.stop()
+        raise SystemExit(f'Bot did not become ready: {bot_task.exception() if bot_task.done() else "timeout"}')
+
+    guild = client.get_guild(int(fake.guild_id))
+    results = {'startup': {
+        'lean_mode': main.LEAN_MODE,
+        'guild_members': len(fake.users) + 1,
+        'cached_members': len(guild.members) if guild else 0,
+        'ready_s': time.monotonic() - booted,
+        'rss_before_mb': rss_before,
+        'rss_ready_mb': _rss_mb(),
+    }}
+    if args.scenario == 'startup':
+        scenarios = ()
+    else:
+        scenarios = SCENARIOS if args.scenario == 'all' else (args.scenario,)
+    for name in scenarios:
+        sampler.reset()
+        calls_before = len(fake.calls)
+        limited_before = sum(fake.rate_limited_by_route.values())
+        started = time.monotonic()
+        report = await SCENARIO_FUNCS[name](fake, client, args)
+        elapsed = time.monotonic() - started
+        report.update({
+            'elapsed_s': elapsed,
+            'api_calls': len(fake.calls) - calls_before,
+            'api_calls_per_s': (len(fake.calls) - calls_before) / max(elapsed, 1e-6),
+            'http_429': sum(fake.rate_limited_by_route.values()) - limited_before,
+            'loop_lag_p50_ms': _percentile(sampler.samples, 0.5) * 1000,
+            'loop_lag_p99_ms': _percentile(sampler.samples, 0.99) * 1000,
+            'loop_lag_max_ms': max(sampler.samples, default=0.0) * 1000,
+            'rss_mb': _rss_mb(),
+        })
+        results[name] = report
+
+    sampler.stop()
+    await client.close()
+    await asyncio.gather(bot_task, return_exceptions=True)
+    await fake.stop()
+    return results
+
+
+async def run_cluster(args) -> dict:
+    """Two workers, one shard each; SIGKILL the guild's worker while its countdowns are running."""
+    from cluster import shard_for_guild
+    from store import WorkerStore
+
+    fake = FakeDiscord(members=max(args.members, args.count), latency=args.latency, shard_count=2)
+    workdir = tempfile.mkdtemp(prefix='voicebot-loadtest-')
+    configure_environment(fake, workdir, args.grace, args.lean)
+    await fake.start()
+    os.environ.update({
+        'DISCORD_API_BASE': f'{fake.base_url}/api/v10',
+        'DISCORD_GATEWAY': f'{fake.base_url.replace("http", "ws")}/gateway',
+        'WORKER_HEARTBEAT_SECONDS': '1',
+        'WORKER_STALE_SECONDS': '3',
+    })
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cluster.py')
+    # Long enough that the survivor has to adopt the timers before the killed worker comes back
+    launcher = await asyncio.create_subprocess_exec(
+        sys.executable, script, '--workers', '2', '--shards', '2', '--restart-delay', '15',
+        stdout=None if args.verbose else asyncio.subprocess.DEVNULL,
+        stderr=None if args.verbose else asyncio.subprocess.DEVNULL,
+    )
+    workers = WorkerStore(os.environ['BOT_DB'])
+    results = {}
+    try:
+        if not await wait_for(lambda: len(fake.sockets) == 2 and fake._socket_for_guild() is not None, timeout=60):
+            raise SystemExit('Cluster workers did not connect')
+        # GUILD_CREATE follows READY; give the owning worker a moment to process it
+        await asyncio.sleep(2)
+
+        users = list(fake.users)
+        for i in range(args.count):
+            fake.send_command('set', users[i % len(users)], fake.timer_channel_id, {'minutes': 1, 'mode': 'live'})
+        await wait_for(lambda: len(fake.messages) >= args.count, timeout=30)
+        created_at = time.monotonic()
+        await asyncio.sleep(5)
+
+        owner = shard_for_guild(int(fake.guild_id), 2)
+        victim = next(row for row in workers.load_all() if owner in map(int, row[2].split(',')))
+        killed_at = time.monotonic()
+        os.kill(victim[1], signal.SIGKILL)
+        await asyncio.sleep(10)
+        resumed = [stamp for stamp, *_ in fake.edits if stamp > killed_at]
+
+        # Every countdown ends about a minute after creation; each owner should get exactly one DM
+        await asyncio.sleep(max(0.0, created_at + 70 - time.monotonic()))
+        results['cluster'] = {
+            'timers_created': sum(1 for m in fake.messages.values() if m['channel_id'] == fake.display_channel_id),
+            'killed_worker': victim[0],
+            'first_edit_after_kill_s': (min(resumed) - killed_at) if resumed else None,
+            'edits_after_kill': len([stamp for stamp, *_ in fake.edits if stamp > killed_at]),
+            'completion_dms': fake.calls_by_route['POST /users/@me/channels'],
+            'workers': [(row[0], row[2], 'live' if row[4] else 'stopped') for row in workers.load_all()],
+        }
+    finally:
+        launcher.send_signal(signal.SIGINT)
+        await launcher.wait()
+        workers.close()
+        await fake.stop()
+    return results
+
+
+SCENARIO_FUNCS = {
+    'timers': scenario_timers,
+    'requests': scenario_requests,
+    'voice-storm': scenario_voice_storm,
+    'reservations': scenario_reservations,
+}
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenario', choices=SCENARIOS + ('startup', 'cluster', 'all'))
+    parser.add_argument('--count', type=int, default=50, help='timers / requests to fire')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds to observe countdowns')
+    parser.add_argument('--rounds', type=int, default=10, help='leave/rejoin rounds for voice-storm')
+    parser.add_argument('--members', type=int, default=100, help='members in the fake guild')
+    parser.add_argument('--idle-members', type=int, default=0, help='extra guild members who are not in voice')
+    parser.add_argument('--lean', action='store_true', help='run the bot with LEAN_MODE=1')
+    parser.add_argument('--latency', type=float, default=0.02, help='fake REST latency in seconds')
+    parser.add_argument('--chaos-429', type=float, default=0.0, help='probability of a spurious 429')
+    parser.add_argument('--grace', type=float, default=1.0, help='VOICE_GRACE_SECONDS for the run')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--verbose', action='store_true', help='keep INFO logging from the bot')
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_cluster(args) if args.scenario == 'cluster' else run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, report in results.items():
+        print(f'== {name}')
+        for key, value in report.items():
+            shown = f'{value:.2f}' if isinstance(value, float) else value
+            print(f'  {key:<18} {shown}')
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
@@ -0,0 +1,117 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+LOG_FILE = os.getenv('LOG_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'log.log')
+# 'size' (default), 'time' or 'none'
+LOG_ROTATE = os.getenv('LOG_ROTATE', 'size').lower()
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight')
+# 'text' (default) or 'json' for JSON lines
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Structured fields picked up from `extra=` on log calls
+EVENT_FIELDS = ('guild', 'channel', 'user', 'latency')
+
+# Formats tracebacks in DroppingQueueHandler.prepare(), on the thread that logged them
+_TRACEBACKS = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any event fields passed through `extra=`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in EVENT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the event loop: when the queue is full the record is counted and dropped."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() folds the traceback into msg; keep it in exc_text so JsonFormatter can emit it as 'exc'
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _TRACEBACKS.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _file_handler(path: str) -> logging.Handler:
+    if LOG_ROTATE == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    if LOG_ROTATE == 'size':
+        return logging.handlers.RotatingFileHandler(
+            path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    return logging.FileHandler(path, encoding='utf-8')
+
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    # Flushes whatever is still queued; tolerate a listener that was already stopped
+    if getattr(listener, '_thread', None) is not None:
+        listener.stop()
+
+
+def setup_logging(level: int = logging.INFO, log_file: str = LOG_FILE) -> DroppingQueueHandler:
+    """Route all logging through a bounded queue drained by a background listener thread.
+
+    File and console I/O happen on the listener thread, never on the event loop.
+    Returns the queue handler so callers can report `dropped`.
+    """
+    formatter = JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(0, _file_handler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    queue_handler.listener = listener
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    return queue_handler
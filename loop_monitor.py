@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+from metrics import metrics
+from supervisor import supervisor
+
+logger = logging.getLogger('cogs')
+
+# How often the loop heartbeat runs, and how long a single callback may hold the loop before it is reported
+LOOP_MONITOR_INTERVAL = float(os.getenv('LOOP_MONITOR_INTERVAL', '0.5'))
+SLOW_CALLBACK_SECONDS = float(os.getenv('SLOW_CALLBACK_SECONDS', '0.25'))
+# Rolling lag window kept for /stats, in seconds
+LOOP_LAG_WINDOW = float(os.getenv('LOOP_LAG_WINDOW', '300'))
+# Task census: how often to count tasks, and the per-coroutine count that first triggers a warning
+TASK_CHECK_INTERVAL = float(os.getenv('TASK_CHECK_INTERVAL', '60'))
+TASK_WARN_COUNT = int(os.getenv('TASK_WARN_COUNT', '200'))
+
+_THIS_FILE = os.path.abspath(__file__)
+_HERE = os.path.dirname(_THIS_FILE)
+
+
+def _task_name(task: asyncio.Task) -> str:
+    # Supervised tasks are named by kind; asyncio's own default names are "Task-<n>"
+    if not task.get_name().startswith('Task-'):
+        return task.get_name()
+    coro = task.get_coro()
+    return getattr(coro, '__qualname__', None) or type(coro).__name__
+
+
+def _culprit(frame) -> str:
+    """Innermost frame that belongs to this bot rather than asyncio/discord.py, as `file:line in func`."""
+    fallback = None
+    while frame is not None:
+        code = frame.f_code
+        location = f'{os.path.basename(code.co_filename)}:{frame.f_lineno} in {code.co_name}'
+        if fallback is None:
+            fallback = location
+        if code.co_filename.startswith(_HERE) and code.co_filename != _THIS_FILE:
+            return location
+        frame = frame.f_back
+    return fallback or 'unknown'
+
+
+class LoopMonitor:
+    """Measures event-loop scheduling lag and reports whatever is holding the loop.
+
+    A coroutine on the loop records a heartbeat every `interval`; how late it wakes up is the
+    scheduling lag. A daemon thread watches the heartbeat, and when it goes stale for longer than
+    `threshold` it samples the loop thread's stack once, so the blocking callback is named while
+    it is still running. A periodic census counts tasks per coroutine to catch leaks.
+    """
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, threshold: float = SLOW_CALLBACK_SECONDS):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = deque(maxlen=max(1, int(LOOP_LAG_WINDOW / interval)))
+        self.task_counts = Counter()
+        self.slow_callbacks = 0
+        self._warned = {}
+        self._beat = time.monotonic()
+        self._loop = None
+        self._loop_thread_id = None
+        self._tasks = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._tasks = [
+            supervisor.supervise(self._heartbeat, 'LoopMonitor._heartbeat', 'LoopMonitor'),
+            supervisor.supervise(self._census, 'LoopMonitor._census', 'LoopMonitor'),
+        ]
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watchdog, name='loop-watchdog', daemon=True)
+        self._thread.start()
+        metrics.register_gauge('event_loop_lag_p99_seconds', lambda: self.lag_quantile(0.99))
+        metrics.register_gauge('asyncio_tasks', self._task_gauge)
+
+    def stop(self):
+        self._stop.set()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        metrics.unregister_gauge('event_loop_lag_p99_seconds')
+        metrics.unregister_gauge('asyncio_tasks')
+
+    def lag_quantile(self, q: float) -> float:
+        if not self.lag:
+            return 0.0
+        ordered = sorted(self.lag)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def _task_gauge(self):
+        # Served from the last census; the exporter may read gauges from another thread
+        return {(('coro', name),): count for name, count in self.task_counts.items()}
+
+    async def _heartbeat(self):
+        while True:
+            start = time.monotonic()
+            self._beat = start
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - start - self.interval)
+            self.lag.append(lag)
+            metrics.observe('event_loop_lag_seconds', lag)
+
+    async def _census(self):
+        while True:
+            await asyncio.sleep(TASK_CHECK_INTERVAL)
+            self.task_counts = Counter(_task_name(task) for task in asyncio.all_tasks(self._loop))
+            for name, count in self.task_counts.items():
+                # Warn at TASK_WARN_COUNT, then again each time that coroutine's count doubles
+                limit = self._warned.get(name, TASK_WARN_COUNT)
+                if count >= limit:
+                    logger.warning(
+                        "[LoopMonitor] %d live tasks running %s (%d tasks total); possible task leak",
+                        count, name, sum(self.task_counts.values())
+                    )
+                    self._warned[name] = count * 2
+
+    def _watchdog(self):
+        """Runs on its own thread: sample the loop thread's stack once per stall."""
+        reported = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or reported == beat:
+                continue
+            reported = beat
+            self.slow_callbacks += 1
+            metrics.inc('slow_callbacks_total')
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            task = asyncio.current_task(self._loop)
+            stack = ''.join(traceback.format_stack(frame, limit=12))
+            logger.warning(
+                "[LoopMonitor] Event loop blocked for %.0fms+ in %s (task: %s)\n%s",
+                stalled * 1000, _culprit(frame), _task_name(task) if task is not None else 'none', stack
+            )
@@ -1,73 +1,173 @@
 import os
+import math
 import logging
 import discord
+import yarl
 from discord.ext import commands
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
+
+# Local modules read their settings from the environment at import time
+from cluster import (  # noqa: E402
+    CLUSTER_WORKER,
+    DISCORD_API_BASE,
+    DISCORD_GATEWAY,
+    SHARD_IDS,
+    ClusterNode,
+    parse_shard_ids,
+)
+from command_sync import EXTENSIONS, sync_if_changed, sync_scope  # noqa: E402
+from guild_config import guild_configs  # noqa: E402
+from log_config import setup_logging  # noqa: E402
+from loop_monitor import LoopMonitor  # noqa: E402
+from metrics import METRICS_TEXTFILE, instrument_http, metrics  # noqa: E402
+from supervisor import supervisor  # noqa: E402
+
 TOKEN = os.getenv('TOKEN')
-GUILD = os.getenv('GUILD')
+# Unset lets discord.py pick the shard count Discord recommends
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+
+# e.g. fake_discord.py for load and cluster tests
+if DISCORD_API_BASE:
+    discord.http.Route.BASE = DISCORD_API_BASE.rstrip('/')
+if DISCORD_GATEWAY:
+    # Only used when SHARD_COUNT is set; otherwise the URL comes from /gateway/bot
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(DISCORD_GATEWAY)
 
 # Validate required env vars
 if not TOKEN:
     raise SystemExit("TOKEN not set in environment")
 
-# Set up logging
-log_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'log.log')
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Set up logging (queued, so file/console I/O stays off the event loop)
+log_handler = setup_logging(logging.INFO)
+
+# Lean mode: no member chunking or message content, only voice members cached, small message cache
+LEAN_MODE = os.getenv('LEAN_MODE', '').lower() in ('1', 'true', 'yes')
+LEAN_MAX_MESSAGES = int(os.getenv('LEAN_MAX_MESSAGES', '0'))
 
 # Update intents for the client
 intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+intents.message_content = not LEAN_MODE
+intents.members = not LEAN_MODE
 intents.voice_states = True
 
 
-class Bot(commands.Bot):
+class Bot(commands.AutoShardedBot):
     def __init__(self):
-        super().__init__(command_prefix='/', intents=intents)
+        options = {'shard_count': SHARD_COUNT}
+        if SHARD_IDS:
+            # Cluster worker: connect only this range (SHARD_COUNT is required alongside it)
+            options['shard_ids'] = parse_shard_ids(SHARD_IDS)
+        if LEAN_MODE:
+            # Slash commands carry their own member/user payloads and the cogs only need who is in
+            # voice, so skip the member list download at READY and cache just members in voice
+            super().__init__(
+                # Only slash commands are used; a mention prefix needs no message content
+                command_prefix=commands.when_mentioned,
+                intents=intents,
+                member_cache_flags=discord.MemberCacheFlags.from_intents(intents),
+                chunk_guilds_at_startup=False,
+                max_messages=LEAN_MAX_MESSAGES or None,
+                **options
+            )
+        else:
+            super().__init__(command_prefix='/', intents=intents, **options)
+        # Per-shard connection history for /stats: shard ID -> {'ready': bool, 'disconnects': int, 'since': datetime}
+        self.shard_health = {}
+        # Live state a cog hands to its replacement during /reload, keyed by cog name
+        self.cog_handoff = {}
 
     async def setup_hook(self):
         """Load cogs and sync commands"""
-        # Load cogs
-        try:
-            await self.load_extension('voice_cog')
-            logging.info('Loaded cog: voice_cog')
-        except Exception as e:
-            logging.error(f'Failed to load voice_cog: {e}')
+        if LEAN_MODE:
+            logging.info('Lean mode: members/message_content intents off, no chunking, '
+                         f'max_messages={LEAN_MAX_MESSAGES or None}')
+        # Instrument REST calls and expose gateway latency before anything talks to Discord
+        instrument_http(self)
+        metrics.register_gauge('gateway_latency_seconds', lambda: None if math.isnan(self.latency) else self.latency)
+        metrics.register_gauge('log_records_dropped_total', lambda: log_handler.dropped, kind='counter')
+        metrics.register_gauge('shard_latency_seconds', self._shard_latencies)
+        metrics.register_gauge('guild_config_cache_misses_total', lambda: guild_configs.misses, kind='counter')
+        metrics.register_gauge('supervised_tasks', supervisor.gauge)
+        # Cluster workers heartbeat before the cogs load so timer recovery only takes this worker's shards
+        self.cluster = None
+        if CLUSTER_WORKER is not None:
+            self.cluster = ClusterNode(CLUSTER_WORKER, parse_shard_ids(SHARD_IDS or '0'), SHARD_COUNT or 1)
+            self.cluster.start(self)
+            logging.info(f'Cluster worker {CLUSTER_WORKER}: shards {SHARD_IDS} of {SHARD_COUNT}')
+
+        # Always-on lag histogram, slow-callback stack samples and task-leak census
+        self.loop_monitor = LoopMonitor()
+        self.loop_monitor.start()
+        if METRICS_TEXTFILE:
+            supervisor.supervise(lambda: metrics.export_forever(METRICS_TEXTFILE), 'metrics_export')
+            logging.info(f'Writing Prometheus metrics to {METRICS_TEXTFILE}')
 
+        # Load cogs
+        for extension in EXTENSIONS:
+            try:
+                await self.load_extension(extension)
+                logging.info(f'Loaded cog: {extension}')
+            except Exception as e:
+                logging.error(f'Failed to load {extension}: {e}')
+
+        # Sync commands to GUILD if set, otherwise global; skipped when nothing changed.
+        # In a cluster the command set is shared, so only worker 0 syncs it.
+        if CLUSTER_WORKER not in (None, 0):
+            return
         try:
-            await self.load_extension('timer_cog')
-            logging.info('Loaded cog: timer_cog')
-        except Exception as e:
-            logging.error(f'Failed to load timer_cog: {e}')
-
-        try:
-            await self.load_extension('admin_cog')
-            logging.info('Loaded cog: admin_cog')
-        except Exception as e:
-            logging.error(f'Failed to load admin_cog: {e}')
-
-        # Sync commands to guild if GUILD is set, otherwise global
-        try:
-            if GUILD:
-                guild_obj = discord.Object(id=int(GUILD))
-                synced = await self.tree.sync(guild=guild_obj)
-                logging.info(f'Synced {len(synced)} slash commands to guild {GUILD}.')
+            guild_obj, scope = sync_scope(self.tree)
+            path, count = await sync_if_changed(self.tree, guild=guild_obj)
+            if path == 'synced':
+                logging.info(f'Synced {count} slash commands ({scope}): command payloads changed.')
+            elif path == 'remote-match':
+                logging.info(f'Skipped sync ({scope}): {count} registered commands already match; stored hash.')
             else:
-                synced = await self.tree.sync()
-                logging.info(f'Synced {len(synced)} slash commands globally.')
+                logging.info(f'Skipped sync ({scope}): {count} commands unchanged since last sync (hash match).')
         except Exception as e:
             logging.error(f'Failed to sync slash commands: {e}')
 
+    def _shard_latencies(self):
+        return {
+            (('shard', shard_id),): latency
+            for shard_id, latency in self.latencies
+            if not math.isnan(latency)
+        } or None
+
+    def _mark_shard(self, shard_id: int, ready: bool):
+        health = self.shard_health.setdefault(shard_id, {'ready': False, 'disconnects': 0, 'since': None})
+        if not ready and health['ready']:
+            health['disconnects'] += 1
+            metrics.inc('shard_disconnects_total', shard=shard_id)
+        if health['ready'] != ready or health['since'] is None:
+            health['since'] = discord.utils.utcnow()
+        health['ready'] = ready
+
+    async def on_shard_ready(self, shard_id: int):
+        self._mark_shard(shard_id, True)
+        logging.info(f'Shard {shard_id} ready')
+
+    async def on_shard_resumed(self, shard_id: int):
+        self._mark_shard(shard_id, True)
+
+    async def on_shard_disconnect(self, shard_id: int):
+        self._mark_shard(shard_id, False)
+        logging.warning(f'Shard {shard_id} disconnected')
+
+    async def close(self):
+        monitor = getattr(self, 'loop_monitor', None)
+        if monitor is not None:
+            monitor.stop()
+        if getattr(self, 'cluster', None) is not None:
+            self.cluster.stop()
+            self.cluster = None
+        # Unloads the cogs, which drain their own tasks
+        await super().close()
+        await supervisor.drain()
+        guild_configs.close()
+
 
 client = Bot()
 
@@ -117,4 +217,5 @@ async def on_app_command_error(interaction: discord.Interaction, error):
 
 
 if __name__ == '__main__':
-    client.run(TOKEN)
\ No newline at end of file
+    # log_handler=None: logging is already configured; don't let discord.py add a synchronous handler
+    client.run(TOKEN, log_handler=None)
\ No newline at end of file
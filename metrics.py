@@ -0,0 +1,214 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import discord
+
+logger = logging.getLogger('cogs')
+
+# Latency buckets in seconds, shared by every histogram so they can be aggregated
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prometheus textfile export (for node_exporter's textfile collector); unset disables it
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE')
+METRICS_INTERVAL = float(os.getenv('METRICS_INTERVAL', '15'))
+# REST calls slower than this are logged with their latency
+SLOW_HTTP_SECONDS = float(os.getenv('SLOW_HTTP_SECONDS', '2'))
+
+# Route of the Discord HTTP request running in the current task, for attributing 429s
+_current_route = contextvars.ContextVar('current_route', default=None)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; quantiles are interpolated within the matching bucket."""
+
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = 0
+        for bound in BUCKETS:
+            if value <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS[index - 1] if index > 0 else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return BUCKETS[-1]
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: str = None) -> str:
+    parts = [f'{name}="{str(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Metrics:
+    """In-process counters, histograms and callback gauges, keyed by metric name and labels."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self._gauge_types = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = _label_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    @contextmanager
+    def timed(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def register_gauge(self, name: str, fn, kind: str = 'gauge'):
+        """Register a callback read at export time; it returns a number or a {labels tuple: value} dict."""
+        self.gauges[name] = fn
+        self._gauge_types[name] = kind
+
+    def unregister_gauge(self, name: str):
+        self.gauges.pop(name, None)
+        self._gauge_types.pop(name, None)
+
+    def observe_ack(self, interaction: discord.Interaction, command: str):
+        """Record how long after Discord created the interaction we acknowledged it."""
+        latency = max(0.0, (discord.utils.utcnow() - interaction.created_at).total_seconds())
+        self.observe('command_ack_seconds', latency, command=command)
+        logger.info(
+            "[Metrics] /%s acknowledged after %.0f ms", command, latency * 1000,
+            extra={'guild': interaction.guild_id, 'channel': interaction.channel_id,
+                   'user': interaction.user.id, 'latency': latency}
+        )
+
+    def read_gauges(self) -> dict:
+        values = {}
+        for name, fn in list(self.gauges.items()):
+            try:
+                value = fn()
+            except Exception:
+                logger.exception("[Metrics] Gauge %s failed", name)
+                continue
+            if value is None:
+                continue
+            values[name] = value if isinstance(value, dict) else {(): value}
+        return values
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            lines.append(f'# TYPE voicebot_{name} counter')
+            for key, value in series.items():
+                lines.append(f'voicebot_{name}{_format_labels(key)} {value}')
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f'# TYPE voicebot_{name} histogram')
+            for key, histogram in series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, histogram.counts):
+                    cumulative += bucket_count
+                    le = f'le="{bound}"'
+                    lines.append(f'voicebot_{name}_bucket{_format_labels(key, le)} {cumulative}')
+                le = 'le="+Inf"'
+                lines.append(f'voicebot_{name}_bucket{_format_labels(key, le)} {histogram.count}')
+                lines.append(f'voicebot_{name}_sum{_format_labels(key)} {histogram.sum}')
+                lines.append(f'voicebot_{name}_count{_format_labels(key)} {histogram.count}')
+        for name, series in sorted(self.read_gauges().items()):
+            lines.append(f'# TYPE voicebot_{name} {self._gauge_types.get(name, "gauge")}')
+            for key, value in series.items():
+                lines.append(f'voicebot_{name}{_format_labels(key)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str):
+        # Write then rename so the collector never reads a half-written file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    async def export_forever(self, path: str, interval: float = METRICS_INTERVAL):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.write_textfile, path)
+            except Exception as e:
+                logger.error("[Metrics] Failed to write %s: %s", path, e)
+
+
+class _RateLimitLogHandler(logging.Handler):
+    """Counts the 429 warnings discord.py logs (and retries internally) against the current route."""
+
+    def __init__(self, registry: Metrics):
+        super().__init__(level=logging.WARNING)
+        self.registry = registry
+
+    def emit(self, record: logging.LogRecord):
+        if isinstance(record.msg, str) and record.msg.startswith('We are being rate limited'):
+            self.registry.inc('discord_http_429_total', route=_current_route.get() or 'unknown')
+
+
+def instrument_http(bot: discord.Client, registry: 'Metrics' = None):
+    """Time every Discord REST call per route template and count 429s per route.
+
+    429s are counted only from discord.py's rate-limit warning, which is logged both for the 429s it
+    retries internally and before the one it finally raises, so each is counted once.
+    """
+    registry = registry or metrics
+    http = bot.http
+    original = http.request
+
+    async def request(route, **kwargs):
+        route_key = f'{route.method} {route.path}'
+        token = _current_route.set(route_key)
+        start = time.perf_counter()
+        try:
+            return await original(route, **kwargs)
+        finally:
+            latency = time.perf_counter() - start
+            registry.observe('discord_http_request_seconds', latency, route=route_key)
+            if latency >= SLOW_HTTP_SECONDS:
+                logger.warning("[Metrics] Slow Discord request %s took %.1fs", route_key, latency,
+                               extra={'latency': latency})
+            _current_route.reset(token)
+
+    http.request = request
+    logging.getLogger('discord.http').addHandler(_RateLimitLogHandler(registry))
+
+
+# Shared registry used by main.py and every cog
+metrics = Metrics()
@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+import logging
+import os
+import random
+from collections import OrderedDict
+
+import discord
+
+from ratelimit import TokenBucket, retry_after
+from supervisor import TASK_DRAIN_SECONDS, supervisor
+
+logger = logging.getLogger('cogs')
+
+# Notifications for the same user within this window are combined into one DM
+NOTIFY_BATCH_SECONDS = float(os.getenv('NOTIFY_BATCH_SECONDS', '1'))
+# DMs being delivered at once
+NOTIFY_CONCURRENCY = int(os.getenv('NOTIFY_CONCURRENCY', '4'))
+# Attempts per DM before giving up; retries back off exponentially with +/-50% jitter
+NOTIFY_ATTEMPTS = 5
+RETRY_BASE = 1.0
+RETRY_MAX = 60.0
+# Client-side budgets per route: opening DM channels shares one small bucket, while sends are limited
+# per DM channel by Discord, so their shared budget only keeps bursts under the global limit
+DM_RATES = {'create_dm': (5, 5.0), 'send_dm': (25, 1.0)}
+# Users whose DM channel ID is remembered, most recently used kept
+DM_CHANNEL_CACHE_SIZE = 10000
+
+
+class NotificationQueue:
+    """Batched, rate-limited, retrying DM delivery.
+
+    `submit` holds a user's notifications for a short window so several arriving together go out
+    as one DM rendered by `render(lines)`. A fixed pool of workers delivers them, each route
+    behind its own token bucket that backs off on 429s. Transient failures are retried with
+    jittered back-off; users with DMs closed are dropped. DM channel IDs are cached, so repeat
+    notifications to a user skip the create-DM call.
+    """
+
+    def __init__(self, bot, render, owner: str = None, window: float = NOTIFY_BATCH_SECONDS,
+                 concurrency: int = NOTIFY_CONCURRENCY):
+        self.bot = bot
+        self.render = render
+        self.owner = owner
+        self.window = window
+        self.concurrency = concurrency
+        self.buckets = {route: TokenBucket(rate, per) for route, (rate, per) in DM_RATES.items()}
+        self.dm_channels = OrderedDict()
+        self._pending = {}
+        self._flushes = {}
+        self._retries = {}
+        self._retry_ids = itertools.count()
+        self._ready = asyncio.Queue()
+        self._workers = []
+        self._inflight = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.combined = 0
+        self.rate_limited = 0
+        self.cache_hits = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending) + self._ready.qsize() + len(self._retries) + self._inflight
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.depth,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'combined': self.combined,
+            'rate_limited': self.rate_limited,
+            'dm_channels_cached': len(self.dm_channels),
+        }
+
+    def submit(self, user_id: int, line: str):
+        """Queue `line` for `user_id`, joining any notification still waiting out its batch window."""
+        lines = self._pending.get(user_id)
+        if lines is not None:
+            if line not in lines:
+                lines.append(line)
+                self.combined += 1
+            return
+        self._pending[user_id] = [line]
+        self._flushes[user_id] = asyncio.get_running_loop().call_later(self.window, self._flush, user_id)
+        if not self._workers:
+            self._workers = [
+                supervisor.supervise(self._work, 'NotificationQueue._work', self.owner)
+                for _ in range(self.concurrency)
+            ]
+
+    def _flush(self, user_id: int):
+        self._flushes.pop(user_id, None)
+        lines = self._pending.pop(user_id, None)
+        if lines:
+            self._ready.put_nowait((user_id, lines, 1))
+
+    def _retry(self, retry_id: int, user_id: int, lines: list, attempt: int):
+        self._retries.pop(retry_id, None)
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            # A newer batch for this user is still open; ride along with it
+            pending.extend(line for line in lines if line not in pending)
+            return
+        self._ready.put_nowait((user_id, lines, attempt))
+
+    async def _work(self):
+        while True:
+            user_id, lines, attempt = await self._ready.get()
+            self._inflight += 1
+            try:
+                await self._deliver(user_id, lines)
+                self.sent += 1
+            except discord.Forbidden as e:
+                # DMs closed or the bot is blocked; retrying won't help
+                self.failed += 1
+                logger.warning("[Notify] Can't DM user %s: %s", user_id, e)
+            except Exception as e:
+                retryable = not isinstance(e, discord.HTTPException) or e.status == 429 or e.status >= 500
+                if retryable and attempt < NOTIFY_ATTEMPTS:
+                    self.retried += 1
+                    delay = min(RETRY_MAX, RETRY_BASE * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                    retry_id = next(self._retry_ids)
+                    self._retries[retry_id] = asyncio.get_running_loop().call_later(
+                        delay, self._retry, retry_id, user_id, lines, attempt + 1
+                    )
+                    logger.info("[Notify] DM to user %s failed (%s); retry %d in %.1fs", user_id, e, attempt, delay)
+                else:
+                    self.failed += 1
+                    logger.warning("[Notify] Giving up on DM to user %s after %d attempts: %s", user_id, attempt, e)
+            finally:
+                self._inflight -= 1
+
+    async def _call(self, route: str, fn, *args):
+        bucket = self.buckets[route]
+        await bucket.acquire()
+        try:
+            return await fn(*args)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self.rate_limited += 1
+                bucket.penalize(retry_after(e, DM_RATES[route][1]))
+            raise
+
+    async def _dm_channel(self, user_id: int) -> int:
+        channel_id = self.dm_channels.get(user_id)
+        if channel_id is not None:
+            self.dm_channels.move_to_end(user_id)
+            self.cache_hits += 1
+            return channel_id
+        data = await self._call('create_dm', self.bot.http.start_private_message, user_id)
+        channel_id = self.dm_channels[user_id] = int(data['id'])
+        if len(self.dm_channels) > DM_CHANNEL_CACHE_SIZE:
+            self.dm_channels.popitem(last=False)
+        return channel_id
+
+    async def _deliver(self, user_id: int, lines: list):
+        content = self.render(lines)
+        channel_id = await self._dm_channel(user_id)
+        channel = self.bot.get_partial_messageable(channel_id, type=discord.ChannelType.private)
+        try:
+            await self._call('send_dm', channel.send, content)
+        except discord.NotFound:
+            # Stale cached channel; open a fresh one and try once more
+            self.dm_channels.pop(user_id, None)
+            channel = self.bot.get_partial_messageable(
+                await self._dm_channel(user_id), type=discord.ChannelType.private
+            )
+            await self._call('send_dm', channel.send, content)
+        logger.info("[Notify] Sent DM to user %s (%d notifications)", user_id, len(lines))
+
+    async def close(self, timeout: float = TASK_DRAIN_SECONDS):
+        """Send whatever is batched, give deliveries up to `timeout` to finish, then stop the workers."""
+        for handle in self._flushes.values():
+            handle.cancel()
+        for user_id in list(self._pending):
+            self._flush(user_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (self._ready.qsize() or self._inflight) and self._workers and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        for handle in self._retries.values():
+            handle.cancel()
+        dropped = self._ready.qsize() + len(self._retries)
+        self._retries.clear()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if dropped:
+            logger.warning("[Notify] Dropped %d undelivered DMs on shutdown", dropped)
@@ -0,0 +1,171 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# Upper bound for a single /profile session, in seconds
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '120'))
+# Stack sampling rate for mode='sample'
+PROFILE_SAMPLE_HZ = float(os.getenv('PROFILE_SAMPLE_HZ', '200'))
+TRACEMALLOC_FRAMES = 10
+
+MODE_SAMPLE = 'sample'
+MODE_CPROFILE = 'cprofile'
+
+# Only one session at a time: cProfile refuses to nest and two samplers would just double the cost
+_session_lock = asyncio.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(code, lineno: int = None) -> str:
+    location = f'{os.path.basename(code.co_filename)}:{lineno if lineno is not None else code.co_firstlineno}'
+    return f'{getattr(code, "co_qualname", code.co_name)} ({location})'
+
+
+class StackSampler:
+    """Samples one thread's stack from a background thread.
+
+    Nothing is hooked into the interpreter, so overhead on the sampled thread is only the GIL
+    hand-off at each sample; safe to run against the live loop. Samples still lean towards
+    points where the thread releases the GIL, so use cProfile when exact call counts matter.
+    """
+
+    def __init__(self, thread_id: int, hz: float = PROFILE_SAMPLE_HZ):
+        self.thread_id = thread_id
+        self.interval = 1.0 / hz
+        self.samples = 0
+        self.self_counts = Counter()
+        self.total_counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._switch_interval = None
+
+    def start(self):
+        # The sampler only runs when the sampled thread lets go of the GIL, which a busy loop does
+        # every switch interval (5ms by default) or when it blocks in the selector. Shorten it so
+        # CPU-bound callbacks get sampled instead of being attributed to the selector.
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval / 10))
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            sys.setswitchinterval(self._switch_interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.self_counts[_frame_label(frame.f_code, frame.f_lineno)] += 1
+            # A recursive function counts once per sample towards its cumulative share
+            seen = set()
+            while frame is not None:
+                label = _frame_label(frame.f_code)
+                if label not in seen:
+                    seen.add(label)
+                    self.total_counts[label] += 1
+                frame = frame.f_back
+
+    def report(self, top: int) -> str:
+        if not self.samples:
+            return 'No samples collected.\n'
+        out = io.StringIO()
+        period_ms = self.interval * 1000
+        out.write(f'{self.samples} samples at {period_ms:.1f}ms; time in the selector is the loop idling\n\n')
+        for title, counts in (('Top functions by cumulative samples', self.total_counts),
+                              ('Top lines by self samples', self.self_counts)):
+            out.write(f'{title}:\n')
+            for label, count in counts.most_common(top):
+                out.write(f'  {count / self.samples:6.1%} {count:>7}  {label}\n')
+            out.write('\n')
+        return out.getvalue()
+
+
+def _cprofile_report(profiler: cProfile.Profile, top: int) -> str:
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    out.write('\n')
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+    return out.getvalue()
+
+
+def _tracemalloc_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, top: int) -> str:
+    out = io.StringIO()
+    current, peak = tracemalloc.get_traced_memory()
+    out.write(f'Traced memory: current={current / 1024:.1f} KiB peak={peak / 1024:.1f} KiB\n\n')
+    out.write('Largest allocation growth during the session:\n')
+    for stat in after.compare_to(before, 'lineno')[:top]:
+        out.write(f'  {stat}\n')
+    out.write('\nLargest live allocation sites:\n')
+    for stat in after.statistics('lineno')[:top]:
+        out.write(f'  {stat}\n')
+    return out.getvalue()
+
+
+async def profile_for(seconds: float, mode: str = MODE_SAMPLE, top: int = 30, memory: bool = False) -> str:
+    """Profile the running event loop for `seconds` and return a plain-text report.
+
+    Raises ProfilerBusy if another session is already running.
+    """
+    if _session_lock.locked():
+        raise ProfilerBusy('A profiling session is already running')
+    seconds = max(1.0, min(seconds, PROFILE_MAX_SECONDS))
+
+    async with _session_lock:
+        started_tracing = False
+        snapshot_before = None
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                started_tracing = True
+            snapshot_before = tracemalloc.take_snapshot()
+
+        sampler = profiler = None
+        started = time.perf_counter()
+        try:
+            if mode == MODE_CPROFILE:
+                # Profiles every callback the loop runs while we sleep, not just this coroutine
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                sampler = StackSampler(threading.get_ident())
+                sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                if sampler is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, sampler.stop)
+            elapsed = time.perf_counter() - started
+
+            def build_report() -> str:
+                sections = [f'Profile ({mode}) of the event loop for {elapsed:.1f}s\n\n']
+                if profiler is not None:
+                    sections.append(_cprofile_report(profiler, top))
+                else:
+                    sections.append(sampler.report(top))
+                if memory:
+                    sections.append('\n' + _tracemalloc_report(snapshot_before, tracemalloc.take_snapshot(), top))
+                return ''.join(sections)
+
+            # Sorting stats and diffing snapshots can take a while; keep it off the loop
+            return await asyncio.get_running_loop().run_in_executor(None, build_report)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
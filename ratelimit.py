@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+
+def retry_after(error, default: float) -> float:
+    """Seconds to back off after a 429 `discord.HTTPException`, from its Retry-After header."""
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers['Retry-After'])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """Client-side token bucket so we stay inside a Discord rate-limit bucket instead of hitting 429s."""
+
+    def __init__(self, rate: int, per: float, clock=time.monotonic):
+        self.capacity = rate
+        self.fill_rate = rate / per
+        self.clock = clock
+        self.tokens = float(rate)
+        self.updated = clock()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.fill_rate)
+            self.updated = now
+
+    def delay(self, now: float = None) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        if now is None:
+            now = self.clock()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.fill_rate
+
+    def try_acquire(self, now: float = None) -> float:
+        """Take a token if one is available; otherwise return how long to wait."""
+        if now is None:
+            now = self.clock()
+        wait = self.delay(now)
+        if wait <= 0:
+            self.tokens -= 1
+        return wait
+
+    async def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def penalize(self, retry_after: float):
+        """Empty the bucket and block it for `retry_after` seconds after a 429."""
+        now = self.clock()
+        self._refill(now)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + retry_after)
@@ -0,0 +1,118 @@
+class TimerRecord:
+    """Compact, ID-only state for one countdown.
+
+    Holds no discord.py objects: messages are addressed through PartialMessage and the owner
+    is resolved when the completion DM is sent. `embed` is only kept while a timer refreshes
+    every second; slower timers rebuild it per frame so idle countdowns stay a few hundred bytes.
+    """
+
+    __slots__ = (
+        'message_id', 'channel_id', 'guild_id', 'owner_id', 'target_ts',
+        'description', 'mode', 'footer_text', 'icon_url', 'deadline', 'embed',
+    )
+
+    def __init__(
+        self,
+        message_id: int,
+        channel_id: int,
+        guild_id: int,
+        owner_id: int,
+        target_ts: int,
+        description: str,
+        mode: str,
+        footer_text: str = None,
+        icon_url: str = None
+    ):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.owner_id = owner_id
+        self.target_ts = target_ts
+        self.description = description
+        self.mode = mode
+        self.footer_text = footer_text
+        self.icon_url = icon_url
+        # Monotonic deadline, filled in when the record is scheduled
+        self.deadline = 0.0
+        self.embed = None
+
+    def as_row(self) -> tuple:
+        """Row in TimerStore.COLUMNS order."""
+        return (
+            self.message_id, self.channel_id, self.guild_id, self.owner_id, self.target_ts,
+            self.description, self.mode, self.footer_text, self.icon_url,
+        )
+
+    @property
+    def jump_url(self) -> str:
+        return f"https://discord.com/channels/{self.guild_id or '@me'}/{self.channel_id}/{self.message_id}"
+
+
+class ReservationRecord:
+    """A voice channel booked for a future start time; `channel_id` is set once it has been created."""
+
+    COLUMNS = (
+        'reservation_id', 'guild_id', 'creator_id', 'channel_name', 'capacity', 'member_ids', 'start_ts', 'channel_id',
+    )
+
+    __slots__ = COLUMNS
+
+    def __init__(
+        self,
+        reservation_id: int,
+        guild_id: int,
+        creator_id: int,
+        channel_name: str,
+        capacity: int,
+        member_ids: str,
+        start_ts: int,
+        channel_id: int = None
+    ):
+        self.reservation_id = reservation_id
+        self.guild_id = guild_id
+        self.creator_id = creator_id
+        self.channel_name = channel_name
+        self.capacity = capacity
+        # Teammates to move in when it opens, as comma-separated IDs (stored as-is)
+        self.member_ids = member_ids
+        self.start_ts = start_ts
+        self.channel_id = channel_id
+
+    def as_row(self) -> tuple:
+        """Row in COLUMNS order."""
+        return tuple(getattr(self, name) for name in self.COLUMNS)
+
+    @property
+    def members(self) -> list:
+        return [int(member_id) for member_id in self.member_ids.split(',') if member_id] if self.member_ids else []
+
+
+class GuildConfig:
+    """Per-guild channel settings; any field may be None until an admin sets it."""
+
+    FIELDS = ('category_id', 'lfg_channel_id', 'timer_channel_id', 'display_channel_id')
+
+    __slots__ = ('guild_id',) + FIELDS
+
+    def __init__(
+        self,
+        guild_id: int,
+        category_id: int = None,
+        lfg_channel_id: int = None,
+        timer_channel_id: int = None,
+        display_channel_id: int = None
+    ):
+        self.guild_id = guild_id
+        self.category_id = category_id
+        self.lfg_channel_id = lfg_channel_id
+        self.timer_channel_id = timer_channel_id
+        self.display_channel_id = display_channel_id
+
+    def as_row(self) -> tuple:
+        """Row in GuildConfigStore.COLUMNS order."""
+        return (self.guild_id, self.category_id, self.lfg_channel_id, self.timer_channel_id, self.display_channel_id)
+
+    def replace(self, **fields) -> 'GuildConfig':
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        values.update(fields)
+        return GuildConfig(self.guild_id, **values)
@@ -0,0 +1,123 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from supervisor import supervisor
+
+logger = logging.getLogger('cogs')
+
+
+class TimerScheduler:
+    """Single min-heap scheduler that drives every timed job in a cog.
+
+    Jobs are keyed so they can be rescheduled or cancelled. A callback receives the job's
+    key and the monotonic time it was due at, and returns the next due time or None to finish.
+    Passing the key lets many jobs share one bound method instead of a closure each.
+    Cancelled and replaced entries are skipped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def schedule(self, key, when: float, callback):
+        """Schedule (or reschedule) `key` to run `callback` at monotonic time `when`."""
+        entry = [when, next(self._counter), key, callback]
+        previous = self._entries.get(key)
+        if previous is not None:
+            previous[3] = None
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wakeup.set()
+
+    def cancel(self, key) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[3] = None
+        return True
+
+    def pending(self) -> dict:
+        """Return {key: due time} for every live job."""
+        return {key: entry[0] for key, entry in self._entries.items()}
+
+    def rebind(self, callback):
+        """Point every live job at `callback`, keeping its due time (used when a cog is reloaded)."""
+        for key, entry in self._entries.items():
+            entry[3] = callback
+
+    def next_due(self):
+        """Return the monotonic time of the earliest live job, or None."""
+        heap = self._heap
+        while heap and heap[0][3] is None:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def run_due(self, now: float = None) -> int:
+        """Run every job due at or before `now` and return how many fired.
+
+        Callbacks are plain functions and must not block; hand any I/O off to a task or queue.
+        """
+        if now is None:
+            now = self.clock()
+        heap = self._heap
+        fired = 0
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            due, _, key, callback = entry
+            if callback is None:
+                continue
+            del self._entries[key]
+            fired += 1
+            try:
+                next_when = callback(key, due)
+            except Exception:
+                logger.exception("[Scheduler] Job %r failed", key)
+                continue
+            if next_when is not None and key not in self._entries:
+                # Re-arm from the previous due time so ticks never accumulate drift
+                self.schedule(key, next_when, callback)
+        return fired
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            due = self.next_due()
+            if due is None:
+                await self._wakeup.wait()
+                continue
+            delay = due - self.clock()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                self.run_due()
+            except Exception:
+                # Never let one bad entry take down every timer in the cog
+                logger.exception("[Scheduler] run_due failed")
+
+    def start(self, owner: str = None):
+        if self._task is None or self._task.done():
+            self._task = supervisor.supervise(self.run, 'TimerScheduler.run', owner)
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,294 @@
+import os
+import sqlite3
+
+# Shared SQLite database for state that has to survive restarts
+DB_PATH = os.getenv('BOT_DB') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.db')
+# How long a write waits on another worker's lock; these calls run on the event loop, so keep it short
+BUSY_TIMEOUT = float(os.getenv('BOT_DB_BUSY_TIMEOUT', '0.25'))
+
+
+def connect(path: str = None, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open the bot database in WAL mode so reads never block on the writer.
+
+    Cluster workers share one file and only hold its write lock for a commit, so BUSY_TIMEOUT covers them.
+    """
+    conn = sqlite3.connect(path or DB_PATH, timeout=BUSY_TIMEOUT, check_same_thread=check_same_thread)
+    conn.execute('PRAGMA journal_mode=WAL')
+    # WAL + NORMAL only fsyncs at checkpoints; commits stay cheap on the event loop
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class TimerStore:
+    """Durable record of every running countdown, keyed by its display message ID."""
+
+    COLUMNS = (
+        'message_id', 'channel_id', 'guild_id', 'owner_id', 'target_ts',
+        'description', 'mode', 'footer_text', 'icon_url',
+    )
+
+    def __init__(self, path: str = None):
+        self.conn = connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS timers (
+                message_id  INTEGER PRIMARY KEY,
+                channel_id  INTEGER NOT NULL,
+                guild_id    INTEGER,
+                owner_id    INTEGER NOT NULL,
+                target_ts   INTEGER NOT NULL,
+                description TEXT,
+                mode        TEXT NOT NULL,
+                footer_text TEXT,
+                icon_url    TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_timers_target_ts ON timers (target_ts);
+            CREATE INDEX IF NOT EXISTS idx_timers_owner_id ON timers (owner_id);
+            """
+        )
+        self.conn.commit()
+
+    def add(self, record):
+        """Insert or replace a TimerRecord."""
+        self.conn.execute('INSERT OR REPLACE INTO timers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', record.as_row())
+        self.conn.commit()
+
+    def remove(self, message_id: int) -> bool:
+        """Delete a timer; False if it was already gone (e.g. another worker completed it)."""
+        deleted = self.conn.execute('DELETE FROM timers WHERE message_id = ?', (message_id,)).rowcount
+        self.conn.commit()
+        return deleted > 0
+
+    def load_all(self) -> list:
+        """Return every stored timer as a tuple in COLUMNS order, soonest first."""
+        return self.conn.execute(
+            f'SELECT {", ".join(self.COLUMNS)} FROM timers ORDER BY target_ts'
+        ).fetchall()
+
+    def by_owner(self, owner_id: int) -> list:
+        return self.conn.execute(
+            f'SELECT {", ".join(self.COLUMNS)} FROM timers WHERE owner_id = ? ORDER BY target_ts',
+            (owner_id,)
+        ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class VoiceChannelStore:
+    """Registry of voice channels the bot created, so they can be cleaned up after a restart."""
+
+    def __init__(self, path: str = None):
+        self.conn = connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS voice_channels (
+                channel_id  INTEGER PRIMARY KEY,
+                guild_id    INTEGER NOT NULL,
+                name        TEXT NOT NULL,
+                creator_id  INTEGER NOT NULL,
+                created_at  REAL NOT NULL
+            );
+            """
+        )
+        self.conn.commit()
+
+    def add(self, channel_id: int, guild_id: int, name: str, creator_id: int, created_at: float):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO voice_channels VALUES (?, ?, ?, ?, ?)',
+            (channel_id, guild_id, name, creator_id, created_at)
+        )
+        self.conn.commit()
+
+    def remove(self, channel_id: int):
+        self.conn.execute('DELETE FROM voice_channels WHERE channel_id = ?', (channel_id,))
+        self.conn.commit()
+
+    def remove_many(self, channel_ids):
+        self.conn.executemany('DELETE FROM voice_channels WHERE channel_id = ?', [(cid,) for cid in channel_ids])
+        self.conn.commit()
+
+    def load_all(self) -> list:
+        """Return (channel_id, guild_id, name, creator_id, created_at) for every tracked channel."""
+        return self.conn.execute(
+            'SELECT channel_id, guild_id, name, creator_id, created_at FROM voice_channels'
+        ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class VoicePoolStore:
+    """Placeholder channels kept warm in the category for instant /request claims."""
+
+    def __init__(self, path: str = None):
+        self.conn = connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS voice_pool (
+                channel_id  INTEGER PRIMARY KEY,
+                guild_id    INTEGER NOT NULL
+            );
+            """
+        )
+        self.conn.commit()
+
+    def add(self, channel_id: int, guild_id: int):
+        self.conn.execute('INSERT OR REPLACE INTO voice_pool VALUES (?, ?)', (channel_id, guild_id))
+        self.conn.commit()
+
+    def remove(self, channel_id: int):
+        self.conn.execute('DELETE FROM voice_pool WHERE channel_id = ?', (channel_id,))
+        self.conn.commit()
+
+    def remove_many(self, channel_ids):
+        self.conn.executemany('DELETE FROM voice_pool WHERE channel_id = ?', [(cid,) for cid in channel_ids])
+        self.conn.commit()
+
+    def load_all(self) -> list:
+        """Return (channel_id, guild_id) for every pooled channel."""
+        return self.conn.execute('SELECT channel_id, guild_id FROM voice_pool').fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class ReservationStore:
+    """Voice channels booked for a future start time, until they open or are cancelled."""
+
+    def __init__(self, path: str = None):
+        self.conn = connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS voice_reservations (
+                reservation_id  INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id        INTEGER NOT NULL,
+                creator_id      INTEGER NOT NULL,
+                channel_name    TEXT NOT NULL,
+                capacity        INTEGER,
+                member_ids      TEXT,
+                start_ts        INTEGER NOT NULL,
+                channel_id      INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_voice_reservations_start_ts ON voice_reservations (start_ts);
+            """
+        )
+        self.conn.commit()
+
+    def add(self, record) -> int:
+        """Insert a ReservationRecord and fill in its new reservation_id."""
+        cursor = self.conn.execute(
+            'INSERT INTO voice_reservations (guild_id, creator_id, channel_name, capacity, member_ids, start_ts) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            record.as_row()[1:-1]
+        )
+        self.conn.commit()
+        record.reservation_id = cursor.lastrowid
+        return record.reservation_id
+
+    def set_channel(self, reservation_id: int, channel_id: int):
+        self.conn.execute(
+            'UPDATE voice_reservations SET channel_id = ? WHERE reservation_id = ?', (channel_id, reservation_id)
+        )
+        self.conn.commit()
+
+    def remove(self, reservation_id: int) -> bool:
+        """Delete a reservation; False if it was already gone."""
+        deleted = self.conn.execute(
+            'DELETE FROM voice_reservations WHERE reservation_id = ?', (reservation_id,)
+        ).rowcount
+        self.conn.commit()
+        return deleted > 0
+
+    def load_all(self) -> list:
+        """Return every reservation as a tuple in ReservationRecord.COLUMNS order, soonest first."""
+        return self.conn.execute(
+            'SELECT reservation_id, guild_id, creator_id, channel_name, capacity, member_ids, start_ts, channel_id '
+            'FROM voice_reservations ORDER BY start_ts'
+        ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class GuildConfigStore:
+    """Per-guild settings (category and channel IDs), so one process can serve many guilds."""
+
+    COLUMNS = ('guild_id', 'category_id', 'lfg_channel_id', 'timer_channel_id', 'display_channel_id')
+
+    def __init__(self, path: str = None):
+        self.conn = connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS guild_config (
+                guild_id            INTEGER PRIMARY KEY,
+                category_id         INTEGER,
+                lfg_channel_id      INTEGER,
+                timer_channel_id    INTEGER,
+                display_channel_id  INTEGER
+            );
+            """
+        )
+        self.conn.commit()
+
+    def upsert(self, row: tuple):
+        """Insert or replace a row in COLUMNS order."""
+        self.conn.execute('INSERT OR REPLACE INTO guild_config VALUES (?, ?, ?, ?, ?)', row)
+        self.conn.commit()
+
+    def get(self, guild_id: int):
+        return self.conn.execute(
+            f'SELECT {", ".join(self.COLUMNS)} FROM guild_config WHERE guild_id = ?', (guild_id,)
+        ).fetchone()
+
+    def remove(self, guild_id: int):
+        self.conn.execute('DELETE FROM guild_config WHERE guild_id = ?', (guild_id,))
+        self.conn.commit()
+
+    def load_all(self) -> list:
+        return self.conn.execute(f'SELECT {", ".join(self.COLUMNS)} FROM guild_config').fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class WorkerStore:
+    """Cluster membership: one heartbeat row per worker process sharing this database."""
+
+    COLUMNS = ('worker_id', 'pid', 'shard_ids', 'shard_count', 'heartbeat_ts', 'stats')
+
+    def __init__(self, path: str = None, check_same_thread: bool = True):
+        self.conn = connect(path, check_same_thread)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cluster_workers (
+                worker_id     INTEGER PRIMARY KEY,
+                pid           INTEGER NOT NULL,
+                shard_ids     TEXT NOT NULL,
+                shard_count   INTEGER NOT NULL,
+                heartbeat_ts  REAL NOT NULL,
+                stats         TEXT
+            );
+            """
+        )
+        self.conn.commit()
+
+    def heartbeat(self, worker_id: int, pid: int, shard_ids: str, shard_count: int, heartbeat_ts: float, stats: str):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO cluster_workers VALUES (?, ?, ?, ?, ?, ?)',
+            (worker_id, pid, shard_ids, shard_count, heartbeat_ts, stats)
+        )
+        self.conn.commit()
+
+    def mark_stopped(self, worker_id: int):
+        """Zero the heartbeat so peers adopt this worker's shards immediately instead of waiting it out."""
+        self.conn.execute('UPDATE cluster_workers SET heartbeat_ts = 0 WHERE worker_id = ?', (worker_id,))
+        self.conn.commit()
+
+    def load_all(self) -> list:
+        return self.conn.execute(
+            f'SELECT {", ".join(self.COLUMNS)} FROM cluster_workers ORDER BY worker_id'
+        ).fetchall()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+
+from metrics import metrics
+
+logger = logging.getLogger('cogs')
+
+# How long cog_unload / shutdown waits for cancelled tasks to finish before giving up on them
+TASK_DRAIN_SECONDS = float(os.getenv('TASK_DRAIN_SECONDS', '5'))
+# Restart back-off for supervised loops: doubles per crash up to the max
+RESTART_BACKOFF = 1.0
+RESTART_BACKOFF_MAX = 60.0
+# A loop that crashes this many times in a row is given up on; a run this long resets the streak
+RESTART_ESCALATE_AFTER = 5
+RESTART_HEALTHY_SECONDS = 60.0
+
+
+class TaskSupervisor:
+    """Registry for every background task the bot starts.
+
+    Tasks are strongly referenced until they finish, so none can be garbage-collected mid-flight,
+    and are labelled by kind and owner (usually a cog name). Failures are logged and counted per
+    kind. Long-running loops are restarted with back-off, and escalated to a critical log once
+    they keep crashing. `drain(owner)` cancels an owner's tasks and waits for them with a deadline.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.failures = Counter()
+        self.escalations = Counter()
+        self._instances = Counter()
+
+    def instance_owner(self, name: str) -> str:
+        """A fresh owner label for one instance of `name` (e.g. "CountdownCog#2").
+
+        Two instances of a cog live side by side during /reload; draining one must not cancel the other's tasks.
+        """
+        self._instances[name] += 1
+        return f'{name}#{self._instances[name]}'
+
+    def spawn(self, coro, kind: str = None, owner: str = None) -> asyncio.Task:
+        """Run `coro` as a tracked task; `kind` defaults to the coroutine's qualified name."""
+        kind = kind or getattr(coro, '__qualname__', type(coro).__name__)
+        task = asyncio.get_running_loop().create_task(coro, name=kind)
+        self._tasks[task] = (owner, kind)
+        task.add_done_callback(self._finished)
+        return task
+
+    def supervise(self, factory, kind: str, owner: str = None) -> asyncio.Task:
+        """Run the coroutine function `factory` as a tracked task, restarting it if it raises."""
+        return self.spawn(self._restarting(factory, kind, owner), kind, owner)
+
+    def _finished(self, task: asyncio.Task):
+        owner, kind = self._tasks.pop(task, (None, None))
+        if task.cancelled() or task.exception() is None:
+            return
+        self.failures[kind] += 1
+        metrics.inc('task_failures_total', kind=kind)
+        logger.error("[Tasks] %s task %s failed", owner or 'bot', kind, exc_info=task.exception())
+
+    async def _restarting(self, factory, kind: str, owner: str):
+        delay = RESTART_BACKOFF
+        crashes = 0
+        while True:
+            started = time.monotonic()
+            try:
+                await factory()
+                return
+            except Exception:
+                if time.monotonic() - started >= RESTART_HEALTHY_SECONDS:
+                    crashes, delay = 0, RESTART_BACKOFF
+                crashes += 1
+                self.failures[kind] += 1
+                metrics.inc('task_failures_total', kind=kind)
+                if crashes >= RESTART_ESCALATE_AFTER:
+                    self.escalations[kind] += 1
+                    metrics.inc('task_escalations_total', kind=kind)
+                    logger.critical("[Tasks] %s loop %s crashed %d times in a row; not restarting it",
+                                    owner or 'bot', kind, crashes, exc_info=True)
+                    return
+                logger.exception("[Tasks] %s loop %s crashed; restarting in %.0fs", owner or 'bot', kind, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RESTART_BACKOFF_MAX)
+
+    def tasks(self, owner: str = None) -> list:
+        return [task for task, (task_owner, _) in self._tasks.items() if owner is None or task_owner == owner]
+
+    def counts(self) -> Counter:
+        """Live tasks per (owner, kind)."""
+        return Counter(self._tasks.values())
+
+    def gauge(self) -> dict:
+        return {(('kind', kind), ('owner', owner or 'bot')): count for (owner, kind), count in self.counts().items()}
+
+    async def drain(self, owner: str = None, timeout: float = TASK_DRAIN_SECONDS) -> int:
+        """Cancel `owner`'s tasks (every task if None) and wait up to `timeout`; returns how many are still running."""
+        current = asyncio.current_task()
+        tasks = [task for task in self.tasks(owner) if task is not current]
+        if not tasks:
+            return 0
+        for task in tasks:
+            task.cancel()
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            stuck = Counter(self._tasks.get(task, (None, '?'))[1] for task in pending)
+            logger.warning("[Tasks] %d %s tasks still running %.0fs after cancel: %s",
+                           len(pending), owner or 'bot', timeout, dict(stuck))
+        return len(pending)
+
+
+# Shared by the bot and every cog
+supervisor = TaskSupervisor()
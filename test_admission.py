@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+
+from admission import AdmissionQueue
+
+GUILD = 1
+
+
+class AdmissionQueueTest(unittest.IsolatedAsyncioTestCase):
+    """A queue whose bucket starts empty and refills slowly, so only claimed jobs can start right away."""
+
+    async def asyncSetUp(self):
+        self.started = []
+        self.pool = ['warm']
+        self.queue = AdmissionQueue(1, 60.0, run=self.start_job, on_wait=lambda job, position, eta: None,
+                                    claim=self.claim)
+        self.queue.bucket(GUILD).tokens = 0.0
+
+    async def start_job(self, job):
+        self.started.append(job)
+
+    def claim(self, guild_id, job) -> bool:
+        if not self.pool:
+            return False
+        job['pooled'] = self.pool.pop()
+        return True
+
+    async def test_one_tokenless_start_per_pooled_channel(self):
+        jobs = [{'n': n, 'pooled': None} for n in range(8)]
+        for job in jobs:
+            self.queue.submit(GUILD, job['n'], job)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        self.assertEqual(self.started, [jobs[0]])
+        self.assertEqual(jobs[0]['pooled'], 'warm')
+        self.assertTrue(all(job['pooled'] is None for job in jobs[1:]))
+        self.assertEqual(self.queue.waiting(GUILD), 7)
+
+    async def test_waits_for_token_when_nothing_to_claim(self):
+        self.pool.clear()
+        self.queue.submit(GUILD, 1, {'pooled': None})
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        self.assertEqual(self.started, [])
+        self.assertEqual(self.queue.waiting(GUILD), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from admin_cog import AdminCog
+from supervisor import supervisor
+
+EXTENSION = 'reload_fixture'
+
+# Same handoff shape as CountdownCog/VoiceCog; ADOPT is rewritten between loads to stand in for new code
+FIXTURE = '''
+import asyncio
+
+from discord.ext import commands
+
+from supervisor import supervisor
+
+ADOPT = {adopt}
+
+
+class ReloadFixture(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.owner = supervisor.instance_owner(self.qualified_name)
+        self.task = None
+        self._handed_off = False
+
+    async def cog_load(self):
+        state = self.bot.cog_handoff.pop(self.qualified_name, None) if ADOPT else None
+        if state is not None:
+            self.owner = state['owner']
+            self.task = state['task']
+        else:
+            self.task = supervisor.spawn(asyncio.sleep(3600), owner=self.owner)
+
+    async def cog_unload(self):
+        if not self._handed_off:
+            await self.release()
+
+    async def release(self):
+        await supervisor.drain(self.owner, timeout=1)
+
+    def export_state(self) -> dict:
+        self._handed_off = True
+        return {{'task': self.task, 'owner': self.owner, 'release': self.release}}
+
+
+async def setup(bot):
+    await bot.add_cog(ReloadFixture(bot))
+'''
+
+
+class ReloadHandoffTest(unittest.IsolatedAsyncioTestCase):
+    """Runs AdminCog.reload_extension against a throwaway extension, no gateway connection."""
+
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        sys.path.insert(0, self.dir.name)
+        self.bot = commands.Bot(command_prefix=commands.when_mentioned, intents=discord.Intents.none())
+        self.bot.cog_handoff = {}
+        self.admin = SimpleNamespace(bot=self.bot)
+        self.write_fixture(adopt=True)
+        await self.bot.load_extension(EXTENSION)
+
+    async def asyncTearDown(self):
+        if EXTENSION in self.bot.extensions:
+            await self.bot.unload_extension(EXTENSION)
+        sys.path.remove(self.dir.name)
+        sys.modules.pop(EXTENSION, None)
+        self.dir.cleanup()
+
+    def write_fixture(self, adopt: bool):
+        with open(os.path.join(self.dir.name, f'{EXTENSION}.py'), 'w') as f:
+            f.write(textwrap.dedent(FIXTURE.format(adopt=adopt)))
+
+    async def reload(self):
+        return await AdminCog.reload_extension(self.admin, EXTENSION)
+
+    async def test_adopted_task_survives_reload(self):
+        old = self.bot.get_cog('ReloadFixture')
+        _, handed_off = await self.reload()
+        new = self.bot.get_cog('ReloadFixture')
+
+        self.assertTrue(handed_off)
+        self.assertIsNot(new, old)
+        self.assertIs(new.task, old.task)
+        self.assertEqual(new.owner, old.owner)
+        await asyncio.sleep(0)
+        self.assertFalse(new.task.done())
+
+    async def test_unadopted_release_spares_new_instance(self):
+        old = self.bot.get_cog('ReloadFixture')
+        self.write_fixture(adopt=False)
+        with self.assertLogs('cogs', 'WARNING'):
+            _, handed_off = await self.reload()
+        new = self.bot.get_cog('ReloadFixture')
+
+        self.assertFalse(handed_off)
+        self.assertNotEqual(new.owner, old.owner)
+        self.assertTrue(old.task.cancelled())
+        self.assertFalse(new.task.done())
+        self.assertEqual(supervisor.tasks(old.owner), [])
+        self.assertEqual(supervisor.tasks(new.owner), [new.task])
+
+
+if __name__ == '__main__':
+    unittest.main()
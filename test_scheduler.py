@@ -0,0 +1,110 @@
+import logging
+import unittest
+
+from scheduler import TimerScheduler
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TimerSchedulerTest(unittest.TestCase):
+    """Drives the scheduler by hand: an injected clock and run_due(), no event loop."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = TimerScheduler(clock=self.clock)
+        self.fired = []
+
+    def job(self, name, every: float = None):
+        def callback(key, due):
+            self.fired.append((name, due))
+            return due + every if every else None
+        return callback
+
+    def test_runs_due_jobs_in_order(self):
+        self.scheduler.schedule('b', 2.0, self.job('b'))
+        self.scheduler.schedule('a', 1.0, self.job('a'))
+        self.scheduler.schedule('c', 5.0, self.job('c'))
+
+        self.assertEqual(self.scheduler.run_due(2.0), 2)
+        self.assertEqual(self.fired, [('a', 1.0), ('b', 2.0)])
+        self.assertEqual(self.scheduler.next_due(), 5.0)
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_reschedule_later_replaces_pending_entry(self):
+        self.scheduler.schedule('a', 5.0, self.job('a'))
+        self.scheduler.schedule('a', 10.0, self.job('a'))
+
+        # The replaced entry must neither fire nor drop the new registration
+        self.assertEqual(self.scheduler.run_due(5.0), 0)
+        self.assertIn('a', self.scheduler)
+        self.assertEqual(self.scheduler.next_due(), 10.0)
+        self.assertEqual(self.scheduler.run_due(10.0), 1)
+        self.assertEqual(self.fired, [('a', 10.0)])
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_reschedule_earlier_fires_once(self):
+        self.scheduler.schedule('a', 10.0, self.job('a'))
+        self.scheduler.schedule('a', 3.0, self.job('a'))
+
+        self.assertEqual(self.scheduler.run_due(20.0), 1)
+        self.assertEqual(self.fired, [('a', 3.0)])
+
+    def test_repeated_reschedules_collapse_to_one_run(self):
+        for when in (1.0, 4.0, 2.0, 6.0):
+            self.scheduler.schedule('a', when, self.job('a'))
+
+        self.assertEqual(self.scheduler.run_due(10.0), 1)
+        self.assertEqual(self.fired, [('a', 6.0)])
+
+    def test_cancel(self):
+        self.scheduler.schedule('a', 1.0, self.job('a'))
+        self.scheduler.schedule('b', 1.0, self.job('b'))
+
+        self.assertTrue(self.scheduler.cancel('a'))
+        self.assertFalse(self.scheduler.cancel('a'))
+        self.assertNotIn('a', self.scheduler)
+        self.assertEqual(self.scheduler.run_due(1.0), 1)
+        self.assertEqual(self.fired, [('b', 1.0)])
+        self.assertIsNone(self.scheduler.next_due())
+
+    def test_rearm_from_due_time_without_drift(self):
+        self.scheduler.schedule('tick', 1.0, self.job('tick', every=1.0))
+
+        # Woken late: every missed tick runs at its own due time and the next one stays on the grid
+        self.clock.now = 3.7
+        self.assertEqual(self.scheduler.run_due(), 3)
+        self.assertEqual(self.fired, [('tick', 1.0), ('tick', 2.0), ('tick', 3.0)])
+        self.assertEqual(self.scheduler.next_due(), 4.0)
+
+    def test_rescheduling_during_callback_wins_over_return_value(self):
+        def callback(key, due):
+            self.scheduler.schedule('a', 50.0, callback)
+            return due + 1.0
+
+        self.scheduler.schedule('a', 1.0, callback)
+        self.scheduler.run_due(1.0)
+        self.assertEqual(self.scheduler.next_due(), 50.0)
+
+    def test_failing_job_does_not_stop_others(self):
+        def boom(key, due):
+            raise RuntimeError('boom')
+
+        self.scheduler.schedule('bad', 1.0, boom)
+        self.scheduler.schedule('good', 2.0, self.job('good'))
+        logging.disable(logging.CRITICAL)
+        try:
+            self.assertEqual(self.scheduler.run_due(2.0), 2)
+        finally:
+            logging.disable(logging.NOTSET)
+        self.assertEqual(self.fired, [('good', 2.0)])
+        self.assertEqual(len(self.scheduler), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,57 +1,199 @@
 from discord import app_commands, Interaction
 import discord
 from discord.ext import commands
-import os
 from datetime import datetime, timezone, timedelta
-import asyncio
 import logging
+import math
+import time
+
+from edit_queue import EditQueue
+from guild_config import guild_configs
+from metrics import metrics
+from notify_queue import NotificationQueue
+from records import TimerRecord
+from scheduler import TimerScheduler
+from store import TimerStore
+from supervisor import supervisor
 
 # Use the shared 'cogs' logger by name to avoid circular import with main
 logger = logging.getLogger('cogs')
 
 # Inline command parameters will be used for /set (amount, unit, description)
 
+# Rendering modes for /set
+MODE_LIVE = 'live'          # HH:MM:SS edited every second
+MODE_ADAPTIVE = 'adaptive'  # hourly far out, per minute within a day, per second in the final minute
+MODE_NATIVE = 'native'      # Discord <t:...> timestamps rendered client-side; edited only on completion
+
+MODE_CHOICES = [
+    app_commands.Choice(name="Adaptive (default)", value=MODE_ADAPTIVE),
+    app_commands.Choice(name="Live seconds", value=MODE_LIVE),
+    app_commands.Choice(name="Native Discord timestamp", value=MODE_NATIVE),
+]
+
 class CountdownCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.display_channel = None
-        self.timer_channel = None
-        self._setup_channels()
+        # Labels this instance's background tasks; taken over by the replacement on /reload
+        self.owner = supervisor.instance_owner(self.qualified_name)
+        # One scheduler drives every countdown; keyed by display message ID
+        self.scheduler = TimerScheduler()
+        self.countdowns = {}
+        # All countdown edits go through one coalescing, rate-limited queue
+        self.edits = EditQueue()
+        # Completion DMs are batched per user and delivered with retries off the tick path; the queue
+        # stops its own workers in close(), so draining this cog's tasks leaves them running until then
+        self.notifications = NotificationQueue(bot, self.completion_message, owner='NotificationQueue')
+        self.store = None
+        self._handed_off = False
     # app command methods in this cog are registered when the cog is added by the bot
 
-    def _setup_channels(self):
-        import os
-        self.timer_channel_id = os.getenv('TIMER_CHANNEL')
-        self.display_channel_id = os.getenv('TIMER_CHANNEL_DISPLAY')
-        if not all([self.timer_channel_id, self.display_channel_id]):
-            logger.warning("[Timer] Channels not properly configured in environment")
+    async def cog_load(self):
+        state = self.bot.cog_handoff.pop(self.qualified_name, None)
+        if state is not None:
+            self.adopt_state(state)
+        else:
+            self.store = TimerStore()
+            self.recover_countdowns()
+        self.scheduler.start(owner=self.owner)
+        metrics.register_gauge('timers_live', lambda: len(self.countdowns))
+        metrics.register_gauge('edit_queue_depth', lambda: self.edits.depth)
+        metrics.register_gauge('edit_queue_sent_total', lambda: self.edits.sent, kind='counter')
+        metrics.register_gauge('edit_queue_dropped_total', lambda: self.edits.dropped, kind='counter')
+        metrics.register_gauge('edit_queue_rate_limited_total', lambda: self.edits.rate_limited, kind='counter')
+        metrics.register_gauge('notify_queue_depth', lambda: self.notifications.depth)
+        metrics.register_gauge('notify_sent_total', lambda: self.notifications.sent, kind='counter')
+        metrics.register_gauge('notify_failed_total', lambda: self.notifications.failed, kind='counter')
+        metrics.register_gauge('notify_retried_total', lambda: self.notifications.retried, kind='counter')
+
+    async def cog_unload(self):
+        for name in ('timers_live', 'edit_queue_depth', 'edit_queue_sent_total',
+                     'edit_queue_dropped_total', 'edit_queue_rate_limited_total', 'notify_queue_depth',
+                     'notify_sent_total', 'notify_failed_total', 'notify_retried_total'):
+            metrics.unregister_gauge(name)
+        if not self._handed_off:
+            await self.release()
+
+    async def release(self):
+        # Completions run inline on the scheduler's tick, so once it stops nothing queues another edit or DM
+        self.scheduler.stop()
+        # Only waits out the scheduler task itself; the edit and DM queues own their workers
+        await supervisor.drain(self.owner)
+        # Batched completion DMs are sent (within the drain deadline) before the queue's workers stop
+        await self.notifications.close()
+        await self.edits.close()
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def export_state(self) -> dict:
+        """Hand this cog's live objects to the instance replacing it on /reload.
+
+        The scheduler keeps running through the swap, so no tick is missed, and in-flight tasks stay
+        registered under this instance's owner label, which the new instance takes over; cog_unload
+        leaves everything open for the new instance.
+        """
+        self._handed_off = True
+        return {
+            'scheduler': self.scheduler,
+            'countdowns': self.countdowns,
+            'edits': self.edits,
+            'notifications': self.notifications,
+            'store': self.store,
+            'owner': self.owner,
+            'release': self.release,
+        }
+
+    def adopt_state(self, state: dict):
+        self.owner = state['owner']
+        self.scheduler = state['scheduler']
+        self.countdowns = state['countdowns']
+        self.edits = state['edits']
+        self.notifications = state['notifications']
+        self.notifications.render = self.completion_message
+        self.store = state['store']
+        self.scheduler.rebind(self.update_countdown)
+        logger.info("[Countdown] Adopted %d running timers from the previous instance", len(self.countdowns))
+
+    def recover_countdowns(self):
+        """Reschedule every stored countdown in one pass; overdue ones complete on the first tick.
+
+        Messages are referenced by ID through PartialMessage, so nothing is fetched up front.
+        """
+        started = time.perf_counter()
+        rows = self.store.load_all()
+        now_ts = time.time()
+        overdue = 0
+        for row in rows:
+            record = TimerRecord(*row)
+            if not self.owns(record.guild_id):
+                continue
+            if record.target_ts <= now_ts:
+                overdue += 1
+            self.start_countdown(record)
+        if rows:
+            logger.info(
+                "[Countdown] Recovered %d timers (%d overdue) in %.1f ms",
+                len(rows), overdue, (time.perf_counter() - started) * 1000
+            )
+
+    def owns(self, guild_id) -> bool:
+        """Whether this process runs countdowns for `guild_id` (always, unless it is a cluster worker)."""
+        cluster = getattr(self.bot, 'cluster', None)
+        return cluster is None or cluster.owns_guild(guild_id)
 
     @commands.Cog.listener()
     async def on_ready(self):
         logger.info("[Countdown] Cog is ready")
 
+    @commands.Cog.listener()
+    async def on_cluster_ownership_changed(self):
+        """Adopt countdowns for shards whose worker went away, and hand them back once it returns."""
+        released = 0
+        for key, record in list(self.countdowns.items()):
+            if not self.owns(record.guild_id):
+                self.scheduler.cancel(key)
+                self.edits.discard(key)
+                del self.countdowns[key]
+                released += 1
+        adopted = 0
+        for row in self.store.load_all():
+            record = TimerRecord(*row)
+            if record.message_id not in self.countdowns and self.owns(record.guild_id):
+                self.start_countdown(record)
+                adopted += 1
+        if adopted or released:
+            logger.info("[Countdown] Cluster ownership changed: adopted %d timers, released %d", adopted, released)
+
     @app_commands.command(name="set", description="Create a new countdown timer")
-    @app_commands.guilds(discord.Object(id=int(os.getenv('GUILD'))))
+    @app_commands.guild_only()
     @app_commands.describe(
         days="Days (0 or more)",
         hours="Hours (0-23)",
         minutes="Minutes (0-59)",
-        description="Optional description"
+        description="Optional description",
+        mode="How the countdown is displayed"
     )
-    async def set_timer(self, interaction: Interaction, days: int = 0, hours: int = 0, minutes: int = 0, description: str = None):
-        if not self.timer_channel_id:
+    @app_commands.choices(mode=MODE_CHOICES)
+    async def set_timer(
+        self,
+        interaction: Interaction,
+        days: int = 0,
+        hours: int = 0,
+        minutes: int = 0,
+        description: str = None,
+        mode: app_commands.Choice[str] = None
+    ):
+        config = guild_configs.get(interaction.guild_id)
+        if not config.timer_channel_id or not config.display_channel_id:
             await interaction.response.send_message("Timer channel not configured.", ephemeral=True)
             return
 
-        try:
-            if str(interaction.channel_id) != self.timer_channel_id:
-                await interaction.response.send_message(
-                    f"Please use this command in <#{self.timer_channel_id}>",
-                    ephemeral=True
-                )
-                return
-        except ValueError:
-            await interaction.response.send_message("Invalid timer channel configuration.", ephemeral=True)
+        if interaction.channel_id != config.timer_channel_id:
+            await interaction.response.send_message(
+                f"Please use this command in <#{config.timer_channel_id}>",
+                ephemeral=True
+            )
             return
 
         # Validate numeric fields
@@ -70,6 +212,7 @@ class CountdownCog(commands.Cog):
             return
 
         desc = description.strip() if description else None
+        mode = mode.value if mode else MODE_ADAPTIVE
 
         now = datetime.now(tz=timezone.utc)
         target_dt = now + timedelta(seconds=total_seconds)
@@ -77,42 +220,53 @@ class CountdownCog(commands.Cog):
 
         remaining = max(0, target_ts - int(datetime.now(tz=timezone.utc).timestamp()))
 
-        embed = discord.Embed(
-            title="⏰ Countdown",
-            description=desc or "No description provided.",
-            color=discord.Color.blue()
-        )
-        embed.add_field(
-            name="Ends At (UTC)",
-            value=target_dt.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-        )
-        embed.add_field(name="Time Remaining", value=self.format_hms(remaining))
-        embed.set_footer(
-            text=f"Created by {interaction.user.display_name}",
+        record = TimerRecord(
+            None,
+            None,
+            interaction.guild_id,
+            interaction.user.id,
+            target_ts,
+            desc,
+            mode,
+            footer_text=f"Created by {interaction.user.display_name}",
             icon_url=interaction.user.display_avatar.url if interaction.user.display_avatar else None
         )
+        embed = self.build_embed(record, remaining)
+
+        # Acknowledge first: posting the display message can wait out the channel's rate-limit bucket
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        metrics.observe_ack(interaction, 'set')
 
+        msg = None
         try:
-            display_channel = self.bot.get_channel(int(self.display_channel_id))
+            display_channel = self.bot.get_channel(config.display_channel_id)
             if not display_channel:
-                display_channel = await self.bot.fetch_channel(int(self.display_channel_id))
+                display_channel = await self.bot.fetch_channel(config.display_channel_id)
 
             msg = await display_channel.send(embed=embed)
-            await interaction.response.send_message(
-                f"Countdown created and posted in {display_channel.mention}",
-                ephemeral=True
-            )
 
-            # Start countdown task (updates every second for HH:MM:SS style)
-            self.bot.loop.create_task(self.update_countdown(msg, target_ts, interaction.user))
+            # Persist first so the countdown survives a restart, then hand it to the scheduler
+            record.message_id = msg.id
+            record.channel_id = msg.channel.id
+            record.embed = embed
+            self.store.add(record)
+            self.start_countdown(record)
         except Exception as e:
             logger.error("[Countdown] Failed to create countdown: %s", e)
-            await interaction.response.send_message(
-                "Failed to create timer. Please try again.",
-                ephemeral=True
-            )
-
+            if msg is not None:
+                # Don't leave a countdown on display that was never persisted or scheduled
+                self.scheduler.cancel(msg.id)
+                self.countdowns.pop(msg.id, None)
+                if self.store is not None:
+                    self.store.remove(msg.id)
+                try:
+                    await msg.delete()
+                except discord.HTTPException:
+                    pass
+            await interaction.followup.send("Failed to create timer. Please try again.", ephemeral=True)
+            return
 
+        await interaction.followup.send(f"Countdown created and posted in {display_channel.mention}", ephemeral=True)
 
     @staticmethod
     def format_remaining(seconds: int) -> str:
@@ -130,6 +284,36 @@ class CountdownCog(commands.Cog):
         parts.append(f"{secs}s")
         return " ".join(parts)
 
+    @staticmethod
+    def format_adaptive(seconds: int, step: int) -> str:
+        """Format remaining time at the granularity it is refreshed at, rounding up to `step`."""
+        if step <= 1:
+            return CountdownCog.format_hms(seconds)
+        seconds = -(-max(0, int(seconds)) // step) * step
+        days, rem = divmod(seconds, 86400)
+        hours, rem = divmod(rem, 3600)
+        minutes = rem // 60
+        parts = []
+        if days:
+            parts.append(f"{days}d")
+        if hours or days:
+            parts.append(f"{hours}h")
+        if step < 3600:
+            parts.append(f"{minutes}m")
+        return " ".join(parts)
+
+    @staticmethod
+    def refresh_step(mode: str, remaining: int) -> int:
+        """Seconds between frames for a countdown with `remaining` seconds left."""
+        if mode == MODE_NATIVE:
+            return max(1, remaining)
+        if mode == MODE_ADAPTIVE:
+            if remaining > 86400:
+                return 3600
+            if remaining > 60:
+                return 60
+        return 1
+
     @staticmethod
     def format_hms(seconds: int) -> str:
         seconds = max(0, int(seconds))
@@ -138,43 +322,110 @@ class CountdownCog(commands.Cog):
         secs = seconds % 60
         return f"{hours:02}:{minutes:02}:{secs:02}"
 
-    async def update_countdown(self, message: discord.Message, target_ts: int, user: discord.User):
+    def build_embed(self, record: TimerRecord, remaining: int) -> discord.Embed:
+        """Build the countdown embed; ticks only rewrite its "Time Remaining" field."""
+        embed = discord.Embed(
+            title="⏰ Countdown",
+            description=record.description or "No description provided.",
+            color=discord.Color.blue()
+        )
+        if record.mode == MODE_NATIVE:
+            embed.add_field(name="Ends At", value=f"<t:{record.target_ts}:F>")
+            embed.add_field(name="Time Remaining", value=f"<t:{record.target_ts}:R>")
+        else:
+            ends_dt = datetime.fromtimestamp(record.target_ts, tz=timezone.utc)
+            embed.add_field(name="Ends At (UTC)", value=ends_dt.strftime("%Y-%m-%d %H:%M:%S UTC"))
+            step = self.refresh_step(record.mode, remaining)
+            embed.add_field(name="Time Remaining", value=self.format_adaptive(remaining, step))
+        if record.footer_text:
+            embed.set_footer(text=record.footer_text, icon_url=record.icon_url)
+        return embed
+
+    def partial_message(self, record: TimerRecord) -> discord.PartialMessage:
+        channel = self.bot.get_partial_messageable(record.channel_id, guild_id=record.guild_id)
+        return channel.get_partial_message(record.message_id)
+
+    def start_countdown(self, record: TimerRecord):
+        """Register a countdown with the scheduler, ticking on boundaries of its refresh step."""
+        now = self.scheduler.clock()
+        record.deadline = now + (record.target_ts - time.time())
+        self.countdowns[record.message_id] = record
+        remaining = math.ceil(record.deadline - now)
+        self.scheduler.schedule(record.message_id, self._next_due(record, remaining), self.update_countdown)
+
+    def _next_due(self, record: TimerRecord, remaining: int) -> float:
+        if remaining <= 0:
+            return record.deadline
+        step = self.refresh_step(record.mode, remaining)
+        # Land on the next multiple of `step` below the current remaining time
+        next_remaining = ((remaining - 1) // step) * step
+        return record.deadline - next_remaining
+
+    def update_countdown(self, key: int, due: float):
+        """Scheduler callback: queue one frame and return the next tick's monotonic due time."""
+        record = self.countdowns.get(key)
+        if record is None:
+            return None
+
+        remaining = math.ceil(record.deadline - due - 1e-6)
+        if remaining <= 0:
+            del self.countdowns[key]
+            # Deleting the row is the claim: if another worker already completed it, don't notify twice
+            if self.store is None or self.store.remove(key):
+                self._complete_countdown(record)
+            return None
+
+        if record.mode == MODE_NATIVE:
+            # Discord renders the relative timestamp client-side; nothing to edit until completion
+            return record.deadline
+
+        # The edit queue keeps only the newest frame if the channel's bucket is saturated
+        try:
+            self._render_countdown(record, remaining)
+        except Exception as e:
+            logger.exception("Error in countdown task: %s", e)
+
+        # Next tick lands exactly on the next refresh boundary before the deadline
+        return self._next_due(record, remaining)
+
+    def _render_countdown(self, record: TimerRecord, remaining: int):
+        step = self.refresh_step(record.mode, remaining)
+        embed = record.embed
+        if embed is None:
+            embed = self.build_embed(record, remaining)
+        else:
+            # Reuse the prebuilt embed; only the remaining-time field changes between frames
+            embed.set_field_at(1, name="Time Remaining", value=self.format_adaptive(remaining, step))
+        # Only per-second timers keep their embed between frames
+        record.embed = embed if step == 1 else None
+        self.edits.submit(self.partial_message(record), embed=embed)
+
+    def _complete_countdown(self, record: TimerRecord):
         try:
-            while True:
-                now_ts = int(datetime.now(tz=timezone.utc).timestamp())
-                remaining = target_ts - now_ts
-
-                if remaining <= 0:
-                    embed = message.embeds[0].copy()
-                    embed.color = discord.Color.red()
-                    embed.clear_fields()
-                    embed.add_field(name="Status", value="⏰ Timer Complete!")
-                    await message.edit(embed=embed)
-
-                    # DM the owner
-                    try:
-                        await user.send(f"Your timer has completed: {message.jump_url}")
-                        logger.info("[Countdown] Sent DM to owner %s for countdown completion", user)
-                    except Exception:
-                        logger.warning("[Countdown] Could not DM owner %s", user)
-
-                    break
-
-                # Update embed with HH:MM:SS remaining
-                embed = message.embeds[0].copy()
-                ends_dt = datetime.fromtimestamp(target_ts, tz=timezone.utc)
-                embed.clear_fields()
-                embed.add_field(
-                    name="Ends At (UTC)",
-                    value=ends_dt.strftime("%Y-%m-%d %H:%M:%S UTC")
-                )
-                embed.add_field(name="Time Remaining", value=self.format_hms(remaining))
-                await message.edit(embed=embed)
-
-                # update every second for a smooth HH:MM:SS countdown
-                await asyncio.sleep(1)
+            embed = record.embed or self.build_embed(record, 0)
+            record.embed = None
+            embed.color = discord.Color.red()
+            embed.clear_fields()
+            embed.add_field(name="Status", value="⏰ Timer Complete!")
+            self.edits.submit(self.partial_message(record), embed=embed)
+
+            # DM the owner by ID; timers of theirs ending together are combined into one message
+            self.notifications.submit(record.owner_id, record.jump_url)
         except Exception as e:
             logger.exception("Error in countdown task: %s", e)
 
+    @staticmethod
+    def completion_message(urls: list) -> str:
+        if len(urls) == 1:
+            return f"Your timer has completed: {urls[0]}"
+        lines = [f"{len(urls)} of your timers have completed:"]
+        for index, url in enumerate(urls):
+            # Stay inside Discord's 2000-character message limit
+            if sum(len(line) + 1 for line in lines) + len(url) + 40 > 2000:
+                lines.append(f"…and {len(urls) - index} more")
+                break
+            lines.append(f"• {url}")
+        return "\n".join(lines)
+
 async def setup(bot):
     await bot.add_cog(CountdownCog(bot))
@@ -4,140 +4,1009 @@ from discord import app_commands, Interaction
 import os
 import logging
 import asyncio
-from datetime import datetime
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from admission import AdmissionQueue, QueueFull
+from guild_config import guild_configs
+from metrics import metrics
+from records import ReservationRecord
+from scheduler import TimerScheduler
+from store import ReservationStore, VoiceChannelStore, VoicePoolStore
+from supervisor import supervisor
 
 logger = logging.getLogger('cogs')
 
-# Environment variables for channel configuration
-CATEGORY = os.getenv('CATEGORY')
-LFG_CHANNEL = os.getenv('LFG_CHANNEL')
+# Category and LFG channel are per guild (see guild_config.py)
+# Seconds a tracked channel must stay empty before it is deleted
+VOICE_GRACE_SECONDS = float(os.getenv('VOICE_GRACE_SECONDS', '5'))
+# Channels younger than this are never deleted, so the creator has time to join
+VOICE_MIN_LIFETIME = float(os.getenv('VOICE_MIN_LIFETIME', '30'))
+# Parallel deletes allowed while reconciling orphaned channels at startup
+RECONCILE_CONCURRENCY = 5
+# A failed delete is retried after DELETE_RETRY_SECONDS, doubling per failure, up to DELETE_RETRY_MAX attempts
+DELETE_RETRY_SECONDS = 5.0
+DELETE_RETRY_MAX = 5
+# Number of hidden placeholder channels kept warm in each configured guild's category (0 disables the pool)
+VOICE_POOL_SIZE = int(os.getenv('VOICE_POOL_SIZE', '0'))
+VOICE_POOL_NAME = os.getenv('VOICE_POOL_NAME', 'standby')
+# Discord allows this many renames per channel per window; pooling renames on every claim and recycle
+CHANNEL_RENAME_LIMIT = 2
+CHANNEL_RENAME_WINDOW = 600.0
+# Longest a claim or recycle edit may wait (e.g. on a rate limit) before the channel is deleted instead
+VOICE_POOL_EDIT_TIMEOUT = float(os.getenv('VOICE_POOL_EDIT_TIMEOUT', '5'))
+# Member moves in flight at once for a single /request
+MOVE_CONCURRENCY = 5
+# Most members one /request moves (creator included) when no capacity is given
+VOICE_MAX_MOVE = 25
+# Channel creates per guild, matched to Discord's create-channel bucket; /request and pool refills share it
+VOICE_CREATE_RATE = int(os.getenv('VOICE_CREATE_RATE', '10'))
+VOICE_CREATE_PER = float(os.getenv('VOICE_CREATE_PER', '10'))
+# Per-user limits: requests waiting or in progress, and tracked channels created and still open (0 disables)
+VOICE_MAX_PENDING = int(os.getenv('VOICE_MAX_PENDING', '1'))
+VOICE_MAX_OWNED = int(os.getenv('VOICE_MAX_OWNED', '2'))
+# Requests allowed to wait in one guild's line before new ones are turned away
+VOICE_QUEUE_MAX = int(os.getenv('VOICE_QUEUE_MAX', '50'))
+# Reserved channels are created between VOICE_RESERVE_LEAD and VOICE_RESERVE_READY seconds before they open,
+# spread evenly across that window so a popular start time never turns into a burst of creates
+VOICE_RESERVE_LEAD = float(os.getenv('VOICE_RESERVE_LEAD', '600'))
+VOICE_RESERVE_READY = float(os.getenv('VOICE_RESERVE_READY', '60'))
+# Upcoming reservations allowed per user
+VOICE_MAX_RESERVATIONS = int(os.getenv('VOICE_MAX_RESERVATIONS', '3'))
+# Seconds before retrying a reserved channel's creation after a failure, or while /request users are queued
+RESERVE_RETRY_SECONDS = 5.0
+# Golden-ratio step: consecutive reservation IDs land far apart in the creation window
+RESERVE_SPREAD_STEP = 0.6180339887
+
+
+def parse_utc_offset(text: str):
+    """Parse "-5", "+5:30" or "0545" into a timedelta within UTC-12:00..+14:00; None if it isn't one."""
+    text = text.strip().replace(':', '')
+    sign = -1 if text.startswith('-') else 1
+    digits = text.lstrip('+-')
+    if not digits.isdigit() or len(digits) > 4:
+        return None
+    hours, minutes = (int(digits[:-2] or 0), int(digits[-2:])) if len(digits) > 2 else (int(digits), 0)
+    if minutes >= 60:
+        return None
+    offset = sign * timedelta(hours=hours, minutes=minutes)
+    if not timedelta(hours=-12) <= offset <= timedelta(hours=14):
+        return None
+    return offset
 
 
 class VoiceCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Labels this instance's background tasks; taken over by the replacement on /reload
+        self.owner = supervisor.instance_owner(self.qualified_name)
         # Dictionary to track created voice channels
         self.created_voice_channels = {}
+        # Occupancy index for tracked channels, maintained from voice_state_update so emptiness
+        # checks are O(1) and never depend on the member cache: channel ID -> member count, and
+        # member ID -> the tracked channel we last saw them in
+        self.occupancy = {}
+        self.member_channels = {}
+        # Debounced cleanup: one pending emptiness check per channel, keyed by channel ID
+        self.reaper = TimerScheduler()
+        self._deleting = set()
+        self.store = None
+        # Warm pools of hidden placeholder channel IDs per guild, claimed by /request
+        self.pools = {}
+        self.pool_store = None
+        self._refill_tasks = {}
+        # Recent rename times (monotonic) per pooled or recycled channel, to stay inside the rename limit
+        self._renames = {}
+        # Fair line in front of channel creation; claiming a warm pooled channel needs no create token
+        self.requests = AdmissionQueue(
+            VOICE_CREATE_RATE, VOICE_CREATE_PER,
+            run=self._fulfil,
+            on_wait=self._queue_status,
+            claim=self._reserve_pooled,
+            max_waiting=VOICE_QUEUE_MAX,
+            owner=self.owner
+        )
+        # Upcoming reservations by ID, all driven by one scheduler: first to create the channel, then to open it
+        self.reservations = {}
+        self.planner = TimerScheduler()
+        self.reservation_store = None
+        self._handed_off = False
+
+    async def cog_load(self):
+        state = self.bot.cog_handoff.pop(self.qualified_name, None)
+        if state is not None:
+            self.adopt_state(state)
+        else:
+            self.store = VoiceChannelStore()
+            self.pool_store = VoicePoolStore()
+            self.reservation_store = ReservationStore()
+            self._spawn(self._reconcile_when_ready())
+        self.reaper.start(owner=self.owner)
+        self.planner.start(owner=self.owner)
+        metrics.register_gauge('voice_channels_tracked', lambda: len(self.created_voice_channels))
+        metrics.register_gauge('voice_pool_size', lambda: sum(len(pool) for pool in self.pools.values()))
+        metrics.register_gauge('voice_request_queue_depth', lambda: self.requests.depth)
+        metrics.register_gauge('voice_reservations_pending', lambda: len(self.reservations))
+
+    async def cog_unload(self):
+        metrics.unregister_gauge('voice_channels_tracked')
+        metrics.unregister_gauge('voice_pool_size')
+        metrics.unregister_gauge('voice_request_queue_depth')
+        metrics.unregister_gauge('voice_reservations_pending')
+        if not self._handed_off:
+            await self.release()
+
+    async def release(self):
+        self.reaper.stop()
+        self.planner.stop()
+        await supervisor.drain(self.owner)
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        if self.pool_store is not None:
+            self.pool_store.close()
+            self.pool_store = None
+        if self.reservation_store is not None:
+            self.reservation_store.close()
+            self.reservation_store = None
+
+    def export_state(self) -> dict:
+        """Hand tracked channels, pools, reservations and pending deletes to the replacement instance on /reload."""
+        self._handed_off = True
+        return {
+            'created_voice_channels': self.created_voice_channels,
+            'occupancy': self.occupancy,
+            'member_channels': self.member_channels,
+            'reaper': self.reaper,
+            'deleting': self._deleting,
+            'store': self.store,
+            'pools': self.pools,
+            'pool_store': self.pool_store,
+            'refill_tasks': self._refill_tasks,
+            'renames': self._renames,
+            'requests': self.requests,
+            'reservations': self.reservations,
+            'planner': self.planner,
+            'reservation_store': self.reservation_store,
+            'owner': self.owner,
+            'release': self.release,
+        }
+
+    def adopt_state(self, state: dict):
+        self.owner = state['owner']
+        self.created_voice_channels = state['created_voice_channels']
+        self.occupancy = state['occupancy']
+        self.member_channels = state['member_channels']
+        self.reaper = state['reaper']
+        self._deleting = state['deleting']
+        self.store = state['store']
+        self.pools = state['pools']
+        self.pool_store = state['pool_store']
+        self._refill_tasks = state['refill_tasks']
+        self._renames = state['renames']
+        self.requests = state['requests']
+        self.requests.run = self._fulfil
+        self.requests.on_wait = self._queue_status
+        self.requests.claim = self._reserve_pooled
+        self.reservations = state['reservations']
+        self.planner = state['planner']
+        self.reservation_store = state['reservation_store']
+        self.reaper.rebind(self._reap)
+        self.planner.rebind(self._reservation_due)
+        logger.info(f"Adopted {len(self.created_voice_channels)} tracked voice channels from the previous instance")
+
+    async def _reconcile_when_ready(self):
+        await self.bot.wait_until_ready()
+        try:
+            await self.reconcile()
+        except Exception as e:
+            logger.error(f"Error reconciling voice channels: {str(e)}")
+        try:
+            self.recover_reservations()
+        except Exception as e:
+            logger.error(f"Error recovering voice reservations: {str(e)}")
+        for config in guild_configs.configured():
+            self.refill_pool(config.guild_id)
+
+    async def reconcile(self):
+        """Match the persisted registry against the channel cache in one pass, across every guild.
+
+        Occupied channels are re-adopted, empty ones are deleted in a bounded-concurrency
+        batch, and entries whose channel no longer exists are dropped in a single write.
+        """
+        rows = {row[0]: row for row in self.store.load_all()}
+        pooled = dict(self.pool_store.load_all())
+        # Channels created ahead of a reservation are meant to sit empty until it opens
+        reserved = {row[-1] for row in self.reservation_store.load_all() if row[-1]}
+        if not rows and not pooled:
+            return
+
+        def guild_available(guild_id) -> bool:
+            # A guild in an outage (or on a shard that isn't up) looks like every channel was deleted
+            guild = self.bot.get_guild(guild_id)
+            return guild is not None and not guild.unavailable
+
+        missing_pooled = []
+        for channel_id, guild_id in pooled.items():
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                if guild_available(guild_id):
+                    missing_pooled.append(channel_id)
+            elif channel.voice_states:
+                # Someone got into a placeholder; let the reaper treat it like any other channel
+                self.pool_store.remove(channel_id)
+            else:
+                self.pools.setdefault(channel.guild.id, []).append(channel_id)
+
+        adopted = []
+        empty = []
+        missing = []
+        for channel_id, row in rows.items():
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                if guild_available(row[1]):
+                    missing.append(channel_id)
+                continue
+            _, _, name, creator_id, created_at = row
+            self.created_voice_channels[channel.id] = {
+                'name': name,
+                'creator': creator_id,
+                'created_at': datetime.fromtimestamp(created_at)
+            }
+            self._index_channel(channel)
+            if self.occupancy[channel.id] or channel.id in reserved:
+                adopted.append(channel)
+            else:
+                empty.append(channel)
+
+        # Deleted while we were offline
+        if missing:
+            self.store.remove_many(missing)
+        if missing_pooled:
+            self.pool_store.remove_many(missing_pooled)
+
+        semaphore = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+        async def delete(channel):
+            async with semaphore:
+                await self._delete_channel(channel)
+
+        for channel in empty:
+            self._deleting.add(channel.id)
+        await asyncio.gather(*(delete(channel) for channel in empty))
+
+        logger.info(
+            f"Reconciled voice channels: adopted {len(adopted)}, deleted {len(empty)} empty, "
+            f"dropped {len(missing)} missing, {sum(len(pool) for pool in self.pools.values())} pooled"
+        )
+
+    def _category(self, guild_id: int):
+        category_id = guild_configs.get(guild_id).category_id
+        return self.bot.get_channel(category_id) if category_id else None
+
+    @staticmethod
+    def _pool_overwrites(guild: discord.Guild) -> dict:
+        # Hidden from everyone but the bot until claimed
+        return {
+            guild.default_role: discord.PermissionOverwrite(view_channel=False, connect=False),
+            guild.me: discord.PermissionOverwrite(view_channel=True, connect=True, manage_channels=True),
+        }
+
+    def refill_pool(self, guild_id: int):
+        """Top a guild's warm pool back up to VOICE_POOL_SIZE in the background."""
+        if VOICE_POOL_SIZE <= 0 or len(self.pools.get(guild_id, ())) >= VOICE_POOL_SIZE:
+            return
+        task = self._refill_tasks.get(guild_id)
+        if task is None or task.done():
+            self._refill_tasks[guild_id] = self._spawn(self._refill_pool(guild_id))
+
+    async def _refill_pool(self, guild_id: int):
+        category = self._category(guild_id)
+        if category is None:
+            return
+        guild = category.guild
+        pool = self.pools.setdefault(guild_id, [])
+        bucket = self.requests.bucket(guild_id)
+        while len(pool) < VOICE_POOL_SIZE:
+            # Users waiting on /request go first; the next claim or request restarts the refill
+            if self.requests.waiting(guild_id):
+                return
+            await bucket.acquire()
+            try:
+                channel = await guild.create_voice_channel(
+                    name=VOICE_POOL_NAME,
+                    category=category,
+                    overwrites=self._pool_overwrites(guild)
+                )
+            except Exception as e:
+                logger.error(f"Error refilling voice channel pool for guild {guild_id}: {str(e)}")
+                return
+            pool.append(channel.id)
+            self.pool_store.add(channel.id, guild.id)
+        logger.info(f"Voice channel pool for guild {guild_id} filled to {len(pool)}")
+
+    def _reserve_pooled(self, guild_id: int, job: dict) -> bool:
+        """Admission callback: set a warm placeholder aside for `job` so it can start without a create token."""
+        pool = self.pools.get(guild_id)
+        if not pool:
+            return False
+        job['pooled'] = pool.pop()
+        return True
+
+    async def _claim_pooled(self, category, name: str, capacity: int, reserved: int = None):
+        """Turn a warm placeholder into the requested channel with a single edit, or return None.
+
+        `reserved` is a placeholder already taken off the pool by _reserve_pooled; it is tried first.
+        """
+        pool = self.pools.get(category.guild.id, [])
+        while reserved is not None or pool:
+            channel_id = reserved if reserved is not None else pool.pop()
+            reserved = None
+            self.pool_store.remove(channel_id)
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                continue
+            if not self._renames_left(channel_id):
+                self._spawn(self._discard_placeholder(channel))
+                continue
+            try:
+                self._note_rename(channel_id)
+                channel = await asyncio.wait_for(
+                    channel.edit(name=name, user_limit=capacity or 0, overwrites=category.overwrites),
+                    VOICE_POOL_EDIT_TIMEOUT
+                )
+            except discord.NotFound:
+                continue
+            except Exception as e:
+                logger.error(f"Error claiming pooled channel {channel_id}: {str(e) or type(e).__name__}")
+                self._spawn(self._discard_placeholder(channel))
+                continue
+            finally:
+                self.refill_pool(category.guild.id)
+            return channel
+        return None
+
+    def _renames_left(self, channel_id: int) -> int:
+        """Renames `channel_id` can still take in the current window without being rate limited."""
+        renames = self._renames.get(channel_id)
+        if not renames:
+            return CHANNEL_RENAME_LIMIT
+        cutoff = time.monotonic() - CHANNEL_RENAME_WINDOW
+        while renames and renames[0] <= cutoff:
+            renames.popleft()
+        return CHANNEL_RENAME_LIMIT - len(renames)
+
+    def _note_rename(self, channel_id: int):
+        self._renames.setdefault(channel_id, deque()).append(time.monotonic())
+
+    async def _discard_placeholder(self, channel: discord.VoiceChannel):
+        """Delete an untracked placeholder that can't be renamed in time."""
+        self._renames.pop(channel.id, None)
+        try:
+            await channel.delete()
+        except discord.NotFound:
+            pass
+        except Exception as e:
+            logger.error(f"Error deleting placeholder channel {channel.id}: {str(e)}")
+
+    async def _recycle_channel(self, channel: discord.VoiceChannel):
+        """Return an empty channel to the pool instead of deleting it.
+
+        Untracked first, so a slow edit never holds it against its creator's VOICE_MAX_OWNED; if the
+        edit fails or times out the channel is deleted instead.
+        """
+        channel_info = self.created_voice_channels.get(channel.id, {'name': channel.name})
+        self._untrack(channel.id)
+        self._deleting.discard(channel.id)
+        try:
+            self._note_rename(channel.id)
+            await asyncio.wait_for(
+                channel.edit(name=VOICE_POOL_NAME, user_limit=0, overwrites=self._pool_overwrites(channel.guild)),
+                VOICE_POOL_EDIT_TIMEOUT
+            )
+        except discord.NotFound:
+            self._renames.pop(channel.id, None)
+            return
+        except Exception as e:
+            logger.error(f"Error recycling channel {channel.id}: {str(e) or type(e).__name__}; deleting it")
+            await self._discard_placeholder(channel)
+            return
+        self.pools.setdefault(channel.guild.id, []).append(channel.id)
+        self.pool_store.add(channel.id, channel.guild.id)
+        logger.info(f"Recycled empty voice channel into pool: {channel_info['name']} (ID: {channel.id})")
+
+    def _spawn(self, coro):
+        return supervisor.spawn(coro, owner=self.owner)
 
     @app_commands.command(name="request", description="Request a voice channel for your group.")
     @app_commands.describe(
         channel_name="Name for your voice channel",
         teammate1="Teammate to move (optional)",
         teammate2="Teammate to move (optional)",
-        capacity="Max members (optional)"
+        capacity="Max members (optional)",
+        bring_channel="Move everyone in your current voice channel (optional)",
+        role="Move every member of this role who is in voice (optional)"
     )
-    @app_commands.guilds(discord.Object(id=int(os.getenv('GUILD'))))
+    @app_commands.guild_only()
     async def handle_req(
         self,
         interaction: discord.Interaction,
         channel_name: str,
         teammate1: discord.Member = None,
         teammate2: discord.Member = None,
-        capacity: int = None
+        capacity: int = None,
+        bring_channel: bool = False,
+        role: discord.Role = None
     ):
         """Request a voice channel for your group."""
+        # Acknowledge first so channel creation and moves never race the 3-second interaction deadline
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        metrics.observe_ack(interaction, 'request')
+        reply = interaction.followup.send
         try:
-            # Check for required environment variables
-            if not CATEGORY or not LFG_CHANNEL:
-                await interaction.response.send_message("Bot misconfiguration: CATEGORY or LFG_CHANNEL not set.", ephemeral=True)
-                logger.error("CATEGORY or LFG_CHANNEL environment variable not set.")
+            # Check this guild is set up (cached; no disk access after the first lookup)
+            config = guild_configs.get(interaction.guild_id)
+            if not config.category_id or not config.lfg_channel_id:
+                await reply("This server isn't set up yet: an admin needs to run /config set.", ephemeral=True)
+                logger.warning(f"/request in unconfigured guild {interaction.guild_id}")
                 return
 
             # Check if the command is used in the LFG channel
-            if str(interaction.channel.id) != str(LFG_CHANNEL):
-                await interaction.response.send_message("Please use this command in the LFG channel.", ephemeral=True)
+            if interaction.channel_id != config.lfg_channel_id:
+                await reply("Please use this command in the LFG channel.", ephemeral=True)
                 logger.warning(f"User {interaction.user.display_name} attempted to use /req in wrong channel")
                 return
 
             # Validate capacity
             if capacity is not None and (capacity < 1 or capacity > 99):
-                await interaction.response.send_message("Capacity must be between 1 and 99.", ephemeral=True)
+                await reply("Capacity must be between 1 and 99.", ephemeral=True)
                 return
 
-            # Create the voice channel
-            try:
-                category_id = int(CATEGORY)
-            except (TypeError, ValueError):
-                await interaction.response.send_message("Bot misconfiguration: CATEGORY is not a valid channel ID.", ephemeral=True)
-                logger.error("CATEGORY environment variable is not a valid integer.")
-                return
-            category = interaction.guild.get_channel(category_id)
+            # Pulling in a whole role moves other people: limit it to moderators, and never @everyone or bot roles
+            if role is not None:
+                if role.is_default() or role.managed:
+                    await reply("That role can't be brought along; pick a regular member role.", ephemeral=True)
+                    return
+                if not interaction.user.guild_permissions.move_members:
+                    await reply("You need the Move Members permission to bring a role.", ephemeral=True)
+                    return
+
+            category = interaction.guild.get_channel(config.category_id)
             if not category:
-                await interaction.response.send_message("Category channel not found.", ephemeral=True)
+                await reply("Category channel not found.", ephemeral=True)
                 return
 
-            new_channel = await interaction.guild.create_voice_channel(
-                name=channel_name,
-                user_limit=capacity,
-                category=category
-            )
+            # Per-user limits keep one member from monopolising the create budget
+            user_id = interaction.user.id
+            if VOICE_MAX_PENDING and self.requests.pending_for(user_id) >= VOICE_MAX_PENDING:
+                metrics.inc('voice_requests_rejected_total', reason='pending')
+                await reply("Your previous channel request is still being set up.", ephemeral=True)
+                return
+            owned = self.owned_channels(user_id)
+            if VOICE_MAX_OWNED and owned >= VOICE_MAX_OWNED:
+                metrics.inc('voice_requests_rejected_total', reason='owned')
+                await reply(
+                    f"You already have {owned} open voice channels; they close once empty.", ephemeral=True
+                )
+                return
 
-            # Add channel to tracking dictionary
-            self.created_voice_channels[new_channel.id] = {
-                'name': channel_name,
-                'creator': interaction.user.id,
-                'created_at': datetime.now()
+            job = {
+                'interaction': interaction,
+                'category': category,
+                'channel_name': channel_name,
+                'capacity': capacity,
+                'teammates': [teammate1, teammate2],
+                'bring_channel': bring_channel,
+                'role': role,
+                'status': None,
+                # Set by _reserve_pooled when admitted on a warm channel instead of a create token
+                'pooled': None,
             }
+            try:
+                self.requests.submit(interaction.guild_id, user_id, job)
+            except QueueFull:
+                metrics.inc('voice_requests_rejected_total', reason='queue_full')
+                await reply("Lots of channels are being created right now; please try again in a minute.",
+                            ephemeral=True)
+
+        except Exception as e:
+            logger.error(f"Error processing /req command: {str(e)}")
+            try:
+                await reply("An error occurred while processing your request.", ephemeral=True)
+            except Exception:
+                pass
+
+    def owned_channels(self, user_id: int) -> int:
+        return sum(1 for info in self.created_voice_channels.values() if info['creator'] == user_id)
 
-            logger.info(f"Created voice channel: {channel_name} (ID: {new_channel.id})")
-
-            # Move the command author if they're in a voice channel
-            if interaction.user.voice and interaction.user.voice.channel:
-                await interaction.user.move_to(new_channel)
-                logger.info(f"Moved creator {interaction.user.display_name} to channel {channel_name}")
-
-            # Move valid teammates
-            moved_members = []
-            for teammate in [teammate1, teammate2]:
-                if teammate and teammate.voice and teammate.voice.channel:
-                    try:
-                        await teammate.move_to(new_channel)
-                        moved_members.append(teammate.display_name)
-                        logger.info(f"Moved member {teammate.display_name} to channel {channel_name}")
-                    except discord.errors.HTTPException as e:
-                        logger.error(f"Failed to move {teammate.display_name}: {str(e)}")
-                        continue
-
-            await interaction.response.send_message(
-                f"Created channel '{channel_name}' and moved {len(moved_members)} teammates.",
-                ephemeral=True
+    def _queue_status(self, job: dict, position: int, eta: float):
+        """Show a queued user where they stand; one status edit in flight per request."""
+        if job['status'] is not None and not job['status'].done():
+            return
+        content = f"⏳ You're #{position + 1} in line for a new channel, ready in about {max(1, round(eta))}s."
+        job['status'] = self._spawn(job['interaction'].edit_original_response(content=content))
+
+    async def _fulfil(self, job: dict):
+        """Create (or claim) the channel for an admitted /request, move the group in and answer."""
+        interaction = job['interaction']
+        channel_name = job['channel_name']
+        capacity = job['capacity']
+        category = job['category']
+        try:
+            # Prefer a warm placeholder (one edit) over a create round-trip
+            new_channel = await self._claim_pooled(category, channel_name, capacity, job['pooled'])
+            if new_channel is None:
+                # Admitted on a pooled channel that turned out unusable: the create still needs a token
+                if job['pooled'] is not None:
+                    await self.requests.bucket(interaction.guild_id).acquire()
+                new_channel = await interaction.guild.create_voice_channel(
+                    name=channel_name,
+                    user_limit=capacity,
+                    category=category
+                )
+
+            self._track_created(new_channel, channel_name, interaction.user.id)
+
+            # Move the creator and every requested member in one concurrent batch
+            members = self._members_to_move(
+                interaction.user, job['teammates'], job['bring_channel'], job['role'], limit=capacity or VOICE_MAX_MOVE
             )
+            results = await self.move_members(members, new_channel)
+            moved = [member for member, error in results if error is None and member.id != interaction.user.id]
+            failed = [(member, error) for member, error in results if error is not None]
+
+            lines = [f"Created channel '{channel_name}' and moved {len(moved)} teammates."]
+            for member, error in failed:
+                lines.append(f"• Could not move {member.display_name}: {error}")
+            await self._answer(job, "\n".join(lines))
 
         except Exception as e:
             logger.error(f"Error processing /req command: {str(e)}")
-            if not interaction.response.is_done():
-                await interaction.response.send_message("An error occurred while processing your request.", ephemeral=True)
+            try:
+                await self._answer(job, "An error occurred while processing your request.")
+            except Exception:
+                pass
+        finally:
+            self.refill_pool(interaction.guild_id)
+
+    def _track_created(self, channel: discord.VoiceChannel, name: str, creator_id: int, reservation=None):
+        """Track and persist a channel made for `creator_id`, and arm its cleanup in case nobody ever joins."""
+        created_at = datetime.now()
+        info = {
+            'name': name,
+            'creator': creator_id,
+            'created_at': created_at
+        }
+        if reservation is not None:
+            info['reservation'] = reservation.reservation_id
+            info['opens_at'] = datetime.fromtimestamp(reservation.start_ts)
+        self.created_voice_channels[channel.id] = info
+        self._index_channel(channel)
+        self.store.add(channel.id, channel.guild.id, name, creator_id, created_at.timestamp())
+
+        logger.info(
+            f"Created voice channel: {name} (ID: {channel.id})",
+            extra={'guild': channel.guild.id, 'channel': channel.id, 'user': creator_id}
+        )
+        # The first join cancels this
+        self.schedule_reap(channel.id)
+
+    @staticmethod
+    async def _answer(job: dict, content: str):
+        # A queued request already showed a status message; replace it rather than stacking a follow-up
+        status = job['status']
+        if status is None:
+            await job['interaction'].followup.send(content, ephemeral=True)
+            return
+        await asyncio.gather(status, return_exceptions=True)
+        await job['interaction'].edit_original_response(content=content)
+
+    @app_commands.command(name="reserve", description="Reserve a voice channel for your group at a set time.")
+    @app_commands.describe(
+        channel_name="Name for your voice channel",
+        start="Start time as HH:MM (24-hour), within the next day",
+        utc_offset="Your UTC offset, e.g. -5, +1 or +5:30 (default 0)",
+        teammate1="Teammate to move in when it opens (optional)",
+        teammate2="Teammate to move in when it opens (optional)",
+        capacity="Max members (optional)"
+    )
+    @app_commands.guild_only()
+    async def reserve(
+        self,
+        interaction: discord.Interaction,
+        channel_name: str,
+        start: str,
+        utc_offset: str = '0',
+        teammate1: discord.Member = None,
+        teammate2: discord.Member = None,
+        capacity: int = None
+    ):
+        """Book a channel for later; it is created shortly before `start` and the group moved in when it opens."""
+        reply = interaction.response.send_message
+        config = guild_configs.get(interaction.guild_id)
+        if not config.category_id or not config.lfg_channel_id:
+            await reply("This server isn't set up yet: an admin needs to run /config set.", ephemeral=True)
+            return
+        if interaction.channel_id != config.lfg_channel_id:
+            await reply("Please use this command in the LFG channel.", ephemeral=True)
+            return
+        if capacity is not None and (capacity < 1 or capacity > 99):
+            await reply("Capacity must be between 1 and 99.", ephemeral=True)
+            return
+        offset = parse_utc_offset(utc_offset)
+        if offset is None:
+            await reply("UTC offset must look like -5 or +5:30, between -12:00 and +14:00.", ephemeral=True)
+            return
+        try:
+            start_time = datetime.strptime(start.strip(), '%H:%M')
+        except ValueError:
+            await reply("Start time must look like 20:00.", ephemeral=True)
+            return
+
+        user_id = interaction.user.id
+        upcoming = sum(1 for record in self.reservations.values() if record.creator_id == user_id)
+        if VOICE_MAX_RESERVATIONS and upcoming >= VOICE_MAX_RESERVATIONS:
+            await reply(f"You already have {upcoming} upcoming reservations.", ephemeral=True)
+            return
+
+        # Next occurrence of that wall-clock time in the user's zone
+        now = datetime.now(tz=timezone(offset))
+        start_dt = now.replace(hour=start_time.hour, minute=start_time.minute, second=0, microsecond=0)
+        if start_dt <= now:
+            start_dt += timedelta(days=1)
+        start_ts = int(start_dt.timestamp())
+
+        teammates = [member.id for member in (teammate1, teammate2) if member and member.id != user_id]
+        record = ReservationRecord(
+            None, interaction.guild_id, user_id, channel_name, capacity,
+            ','.join(str(member_id) for member_id in dict.fromkeys(teammates)), start_ts
+        )
+        self.reservation_store.add(record)
+        self.schedule_reservation(record)
+        await reply(
+            f"Reserved '{channel_name}' for <t:{start_ts}:t> (<t:{start_ts}:R>). It will be ready a few minutes "
+            f"early, and everyone in voice is moved in when it opens.",
+            ephemeral=True
+        )
+        metrics.observe_ack(interaction, 'reserve')
+        logger.info(
+            f"Reserved voice channel {channel_name} for {start_dt.isoformat()} (reservation {record.reservation_id})",
+            extra={'guild': interaction.guild_id, 'user': user_id}
+        )
+
+    @app_commands.command(name="unreserve", description="Cancel one of your voice channel reservations.")
+    @app_commands.describe(channel_name="Name of the reserved channel")
+    @app_commands.guild_only()
+    async def unreserve(self, interaction: discord.Interaction, channel_name: str):
+        """Cancel the caller's reservation by name; a channel already made for it is cleaned up as usual."""
+        wanted = channel_name.strip().lower()
+        record = next(
+            (
+                record for record in sorted(self.reservations.values(), key=lambda r: r.start_ts)
+                if record.creator_id == interaction.user.id and record.guild_id == interaction.guild_id
+                and record.channel_name.lower() == wanted
+            ),
+            None
+        )
+        if record is None:
+            await interaction.response.send_message(f"No upcoming reservation named '{channel_name}'.", ephemeral=True)
+            return
+        self._drop_reservation(record)
+        info = self.created_voice_channels.get(record.channel_id)
+        if info is not None:
+            info.pop('reservation', None)
+            info.pop('opens_at', None)
+            if not self.occupancy.get(record.channel_id):
+                self.schedule_reap(record.channel_id)
+        await interaction.response.send_message(f"Cancelled your reservation '{record.channel_name}'.", ephemeral=True)
+
+    def _monotonic(self, ts: float) -> float:
+        return self.planner.clock() + (ts - time.time())
+
+    def _prepare_at(self, record: ReservationRecord) -> float:
+        """Monotonic time to create `record`'s channel: a fixed point in the lead window, picked by ID."""
+        offset = (record.reservation_id * RESERVE_SPREAD_STEP) % 1.0
+        lead = VOICE_RESERVE_READY + offset * max(0.0, VOICE_RESERVE_LEAD - VOICE_RESERVE_READY)
+        return self._monotonic(record.start_ts - lead)
+
+    def schedule_reservation(self, record: ReservationRecord):
+        """Arm `record`'s next step: creating its channel, or opening it once the channel exists."""
+        self.reservations[record.reservation_id] = record
+        when = self._prepare_at(record) if record.channel_id is None else self._monotonic(record.start_ts)
+        self.planner.schedule(record.reservation_id, when, self._reservation_due)
+
+    def recover_reservations(self):
+        """Reschedule stored reservations for the guilds this process serves; overdue ones run on the first tick."""
+        recovered = 0
+        for row in self.reservation_store.load_all():
+            record = ReservationRecord(*row)
+            if record.reservation_id in self.reservations or self.bot.get_guild(record.guild_id) is None:
+                continue
+            if record.channel_id is not None:
+                info = self.created_voice_channels.get(record.channel_id)
+                if info is None:
+                    # The channel made for it was deleted while we were offline; make another
+                    record.channel_id = None
+                else:
+                    info['reservation'] = record.reservation_id
+                    info['opens_at'] = datetime.fromtimestamp(record.start_ts)
+                    self.schedule_reap(record.channel_id)
+            self.schedule_reservation(record)
+            recovered += 1
+        if recovered:
+            logger.info(f"Recovered {recovered} voice reservations")
+
+    def _drop_reservation(self, record: ReservationRecord):
+        self.reservations.pop(record.reservation_id, None)
+        self.planner.cancel(record.reservation_id)
+        if self.reservation_store is not None:
+            self.reservation_store.remove(record.reservation_id)
+
+    def _reservation_due(self, reservation_id: int, due: float):
+        """Planner callback: hand the reservation's next step to a task."""
+        record = self.reservations.get(reservation_id)
+        if record is None:
+            return None
+        if record.channel_id is None:
+            self._spawn(self._prepare_reservation(record))
+        else:
+            self._spawn(self._open_reservation(record))
+        return None
+
+    async def _prepare_reservation(self, record: ReservationRecord):
+        """Create (or claim) a reserved channel ahead of its start, sharing the create budget with /request."""
+        guild_id = record.guild_id
+        retry_at = self.planner.clock() + RESERVE_RETRY_SECONDS
+        # Users waiting on /request go first until the reservation is about to open
+        if self.requests.waiting(guild_id) and time.time() < record.start_ts - VOICE_RESERVE_READY:
+            self.planner.schedule(record.reservation_id, retry_at, self._reservation_due)
+            return
+        category = self._category(guild_id)
+        if category is None:
+            logger.warning(f"Dropping voice reservation {record.reservation_id}: guild {guild_id} has no category")
+            self._drop_reservation(record)
+            return
+        try:
+            channel = await self._claim_pooled(category, record.channel_name, record.capacity)
+            if channel is None:
+                await self.requests.bucket(guild_id).acquire()
+                channel = await category.guild.create_voice_channel(
+                    name=record.channel_name,
+                    user_limit=record.capacity,
+                    category=category
+                )
+        except Exception as e:
+            if time.time() < record.start_ts:
+                logger.error(f"Error creating reserved channel {record.channel_name}: {str(e)}; retrying")
+                self.planner.schedule(record.reservation_id, retry_at, self._reservation_due)
+            else:
+                logger.error(f"Giving up on reserved channel {record.channel_name}: {str(e)}")
+                self._drop_reservation(record)
+            return
+
+        if record.reservation_id not in self.reservations:
+            # Cancelled while the channel was being made; treat it like any other new channel
+            self._track_created(channel, record.channel_name, record.creator_id)
+            return
+        self._track_created(channel, record.channel_name, record.creator_id, reservation=record)
+        record.channel_id = channel.id
+        self.reservation_store.set_channel(record.reservation_id, channel.id)
+        self.schedule_reservation(record)
+
+    async def _open_reservation(self, record: ReservationRecord):
+        """Move the group into their reserved channel and ping whoever wasn't in voice."""
+        channel = self.bot.get_channel(record.channel_id)
+        if channel is None or record.channel_id not in self.created_voice_channels:
+            self._drop_reservation(record)
+            logger.warning(f"Reserved channel {record.channel_name} (ID: {record.channel_id}) is gone; not opening it")
+            return
+        guild = channel.guild
+        member_ids = [record.creator_id, *record.members]
+        members = self._members_to_move(
+            guild.get_member(record.creator_id), map(guild.get_member, record.members),
+            limit=record.capacity or VOICE_MAX_MOVE
+        )
+        try:
+            results = await self.move_members(members, channel)
+        finally:
+            # The reaper leaves the channel alone until now; from here it is an ordinary channel
+            self._drop_reservation(record)
+            if not self.occupancy.get(channel.id) and channel.id in self.created_voice_channels:
+                self.schedule_reap(channel.id)
+        moved = {member.id for member, error in results if error is None}
+        logger.info(
+            f"Opened reserved voice channel {record.channel_name} (ID: {channel.id}), "
+            f"moved {len(moved)} of {len(member_ids)} members",
+            extra={'guild': guild.id, 'channel': channel.id, 'user': record.creator_id}
+        )
+
+        absent = [member_id for member_id in member_ids if member_id not in moved]
+        lfg_channel_id = guild_configs.get(guild.id).lfg_channel_id
+        if not absent or not lfg_channel_id:
+            return
+        try:
+            await self.bot.get_partial_messageable(lfg_channel_id, guild_id=guild.id).send(
+                f"{' '.join(f'<@{member_id}>' for member_id in absent)} your reserved channel {channel.mention} "
+                f"is open.",
+                allowed_mentions=discord.AllowedMentions(everyone=False, roles=False, users=True)
+            )
+        except discord.HTTPException as e:
+            logger.warning(f"Couldn't announce reserved channel {channel.id}: {str(e)}")
+
+    @staticmethod
+    def _members_to_move(
+        creator, teammates, bring_channel: bool = False, role: discord.Role = None, limit: int = VOICE_MAX_MOVE
+    ) -> list:
+        """Collect up to `limit` members to move (creator first), skipping duplicates and members not in voice."""
+        candidates = [creator, *teammates]
+        if bring_channel and creator.voice and creator.voice.channel:
+            candidates.extend(creator.voice.channel.members)
+        if role is not None:
+            candidates.extend(role.members)
+
+        members = {}
+        for member in candidates:
+            if len(members) >= limit:
+                break
+            if member and member.id not in members and member.voice and member.voice.channel:
+                members[member.id] = member
+        return list(members.values())
+
+    async def move_members(self, members, channel: discord.VoiceChannel) -> list:
+        """Move members concurrently (bounded by MOVE_CONCURRENCY); returns (member, error or None) pairs."""
+        semaphore = asyncio.Semaphore(MOVE_CONCURRENCY)
+
+        async def move(member):
+            if member.voice and member.voice.channel and member.voice.channel.id == channel.id:
+                return member, None
+            async with semaphore:
+                try:
+                    await member.move_to(channel)
+                    logger.info(f"Moved member {member.display_name} to channel {channel.name}")
+                    return member, None
+                except discord.errors.HTTPException as e:
+                    logger.error(f"Failed to move {member.display_name}: {str(e)}")
+                    return member, e.text or str(e)
+
+        return await asyncio.gather(*(move(member) for member in members))
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # A new session (not a resume) replays no voice events for the gap; recount from its voice states
+        self.rebuild_occupancy()
+
+    def _index_channel(self, channel: discord.VoiceChannel):
+        self.occupancy[channel.id] = 0
+        for member_id in channel.voice_states:
+            self.member_channels[member_id] = channel.id
+            self.occupancy[channel.id] += 1
+
+    def rebuild_occupancy(self):
+        self.occupancy.clear()
+        self.member_channels.clear()
+        for channel_id in list(self.created_voice_channels):
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                continue
+            self._index_channel(channel)
+            if not self.occupancy[channel_id] and channel_id not in self.reaper:
+                self.schedule_reap(channel_id)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         """
         Handle voice state updates to track and cleanup empty channels
         """
+        with metrics.timed('event_handler_seconds', event='voice_state_update'):
+            self._handle_voice_state(member, after)
+
+    def _handle_voice_state(self, member, after):
         try:
-            # Check if the user left a voice channel
-            if before.channel and before.channel.id in self.created_voice_channels:
-                # Wait a short moment to ensure the state is stable
-                await asyncio.sleep(1)
-                
-                # If the channel is empty
-                if len(before.channel.members) == 0:
-                    try:
-                        # Get channel info for logging
-                        channel_info = self.created_voice_channels[before.channel.id]
-                        
-                        # Delete the channel
-                        await before.channel.delete()
-                        
-                        # Remove from tracking
-                        del self.created_voice_channels[before.channel.id]
-                        
-                        logger.info(f"Deleted empty voice channel: {channel_info['name']} (ID: {before.channel.id})")
-                    except Exception as e:
-                        logger.error(f"Error deleting channel {before.channel.id}: {str(e)}")
+            # `after` is discord.py's live voice state, so when events arrive in a burst an earlier
+            # handler already sees the latest channel. Diffing against where we last saw the member,
+            # rather than trusting `before`, keeps the counts exact either way.
+            joined = after.channel.id if after.channel and after.channel.id in self.occupancy else None
+            left = self.member_channels.get(member.id)
+            if joined == left:
+                return
+            if joined is None:
+                self.member_channels.pop(member.id, None)
+            else:
+                self.member_channels[member.id] = joined
+
+            # Someone (re)joined a tracked channel: cancel its pending delete
+            if joined is not None:
+                self.occupancy[joined] += 1
+                if self.reaper.cancel(joined):
+                    logger.info(f"Cancelled pending delete for voice channel {joined}")
+
+            # Someone left a tracked channel: (re)arm its debounced emptiness check
+            if left is not None and left in self.occupancy:
+                self.occupancy[left] = max(0, self.occupancy[left] - 1)
+                self.schedule_reap(left)
 
         except Exception as e:
             logger.error(f"Error in voice state update handler: {str(e)}")
 
+    def schedule_reap(self, channel_id: int, backoff: float = 0.0):
+        """Check `channel_id` for emptiness once the grace period (and minimum lifetime) has passed.
+
+        Rescheduling replaces the pending check, so a burst of leaves collapses into one. `backoff`
+        pushes the check out further, e.g. after a failed delete.
+        """
+        info = self.created_voice_channels[channel_id]
+        now = datetime.now()
+        age = (now - info['created_at']).total_seconds()
+        delay = max(VOICE_GRACE_SECONDS, VOICE_MIN_LIFETIME - age, backoff)
+        if 'opens_at' in info:
+            # A reserved channel is held until it opens, then gets the usual minimum lifetime from there
+            delay = max(delay, (info['opens_at'] - now).total_seconds() + VOICE_MIN_LIFETIME)
+        self.reaper.schedule(channel_id, self.reaper.clock() + delay, self._reap)
+
+    def _reap(self, channel_id: int, due: float):
+        """Scheduler callback: start a single delete if the channel is still empty."""
+        info = self.created_voice_channels.get(channel_id)
+        if info is None or channel_id in self._deleting:
+            return None
+        if info.get('reservation') in self.reservations:
+            # Held for a reservation that hasn't opened yet; opening it re-arms the check
+            return None
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            # Deleted out from under us; just stop tracking it
+            self._untrack(channel_id)
+            return None
+        if self.occupancy.get(channel_id, 0) == 0:
+            self._deleting.add(channel_id)
+            # Recycling renames it now and claiming renames it again, so it needs two renames left
+            if len(self.pools.get(channel.guild.id, ())) < VOICE_POOL_SIZE and self._renames_left(channel_id) >= 2:
+                self._spawn(self._recycle_channel(channel))
+            else:
+                self._spawn(self._delete_channel(channel))
+        return None
+
+    def _untrack(self, channel_id: int):
+        self.created_voice_channels.pop(channel_id, None)
+        self.occupancy.pop(channel_id, None)
+        self.reaper.cancel(channel_id)
+        if self.store is not None:
+            self.store.remove(channel_id)
+
+    async def _delete_channel(self, channel: discord.VoiceChannel):
+        try:
+            # Get channel info for logging
+            channel_info = self.created_voice_channels.get(channel.id, {'name': channel.name})
+
+            # Delete the channel
+            await channel.delete()
+
+            # Remove from tracking
+            self._untrack(channel.id)
+            self._renames.pop(channel.id, None)
+
+            logger.info(f"Deleted empty voice channel: {channel_info['name']} (ID: {channel.id})")
+        except discord.NotFound:
+            self._untrack(channel.id)
+        except Exception as e:
+            self._retry_delete(channel.id, e)
+        finally:
+            self._deleting.discard(channel.id)
+
+    def _retry_delete(self, channel_id: int, error: Exception):
+        """Re-arm the reap of a channel whose delete failed, backing off until DELETE_RETRY_MAX attempts."""
+        info = self.created_voice_channels.get(channel_id)
+        if info is None:
+            logger.error(f"Error deleting channel {channel_id}: {str(error)}")
+            return
+        failures = info['delete_failures'] = info.get('delete_failures', 0) + 1
+        if failures >= DELETE_RETRY_MAX:
+            logger.warning(f"Giving up deleting channel {channel_id} after {failures} attempts: {str(error)}")
+            return
+        backoff = DELETE_RETRY_SECONDS * 2 ** (failures - 1)
+        logger.error(f"Error deleting channel {channel_id}: {str(error)}; retrying in {backoff:.0f}s")
+        self.schedule_reap(channel_id, backoff)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(VoiceCog(bot))